@@ -0,0 +1,185 @@
+"""Caching wrapper for the custom authentication class hook.
+
+Use it by pointing ``OSEOSERVER_AUTHENTICATION_CLASS`` to
+``config.auth.CachingAuthentication`` and moving the real authentication
+class to ``OSEOSERVER_CACHED_AUTHENTICATION_CLASS``. The cache is tuned with
+the ``OSEOSERVER_AUTHENTICATION_CACHE`` setting.
+
+"""
+
+import collections
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from lxml import etree
+
+from . import metrics
+
+DEFAULT_CACHE_SETTINGS = {
+    "ttl": 300,
+    "negative_ttl": 30,
+    "max_size": 10000,
+}
+
+# only authentication failures are kept in the negative cache. Other errors,
+# like timeouts when contacting an identity service, are not cached
+NEGATIVE_CACHE_ERRORS = ("oseoserver.errors.OseoError",)
+
+WSSE_NAMESPACE = ("http://docs.oasis-open.org/wss/2004/01/"
+                  "oasis-200401-wss-wssecurity-secext-1.0.xsd")
+
+CacheEntry = collections.namedtuple("CacheEntry",
+                                    ["expires", "result", "error"])
+
+
+class AuthenticationCache(object):
+    """A thread safe LRU cache with expiring entries.
+
+    Successful results are kept for ``ttl`` seconds and failures for
+    ``negative_ttl`` seconds. Failures are stored without their traceback
+    and each lookup gets its own copy of the error, so that it can be raised
+    again without keeping old frames alive. When the cache holds
+    ``max_size`` entries the least recently used one is evicted.
+
+    """
+
+    def __init__(self, ttl, negative_ttl, max_size, clock=time.time):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached entry for the key or None"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry.expires <= self.clock():
+                self.misses += 1
+                return None
+            self._entries[key] = entry  # mark it as the most recently used
+            self.hits += 1
+            if entry.error is not None:
+                entry = entry._replace(error=copy.copy(entry.error))
+            return entry
+
+    def set_result(self, key, result):
+        self._set(key, CacheEntry(self.clock() + self.ttl, result, None))
+
+    def set_error(self, key, error):
+        self._set(key, CacheEntry(self.clock() + self.negative_ttl,
+                                  None, copy.copy(error)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _set(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def get_token_key(request_element, soap_version):
+    """Return a hash of the request's WS-Security UsernameToken.
+
+    :arg request_element: The full request object
+    :type request_element: lxml.etree.Element
+    :arg soap_version: The SOAP version in use
+    :type soap_version: str
+    :return: The hash or None, if the request has no UsernameToken
+    :rtype: str
+
+    """
+
+    tokens = request_element.xpath("//wsse:UsernameToken",
+                                   namespaces={"wsse": WSSE_NAMESPACE})
+    if not tokens:
+        return None
+    digest = hashlib.sha256(etree.tostring(tokens[0], method="c14n"))
+    digest.update(str(soap_version).encode("utf-8"))
+    return digest.hexdigest()
+
+
+_cache = None
+_authenticator = None
+_negative_cache_errors = None
+_setup_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _setup_lock:
+            if _cache is None:
+                cache_settings = DEFAULT_CACHE_SETTINGS.copy()
+                cache_settings.update(
+                    getattr(settings, "OSEOSERVER_AUTHENTICATION_CACHE", {}))
+                _cache = AuthenticationCache(**cache_settings)
+    return _cache
+
+
+def get_authenticator():
+    global _authenticator
+    if _authenticator is None:
+        with _setup_lock:
+            if _authenticator is None:
+                authentication_class = import_string(
+                    settings.OSEOSERVER_CACHED_AUTHENTICATION_CLASS)
+                _authenticator = authentication_class()
+    return _authenticator
+
+
+def get_negative_cache_errors():
+    global _negative_cache_errors
+    if _negative_cache_errors is None:
+        _negative_cache_errors = tuple(
+            import_string(path) for path in NEGATIVE_CACHE_ERRORS)
+    return _negative_cache_errors
+
+
+class CachingAuthentication(object):
+    """Authentication class that caches the results of another one.
+
+    The cache is shared by every instance in the same process, so that it
+    survives across requests.
+
+    """
+
+    def authenticate_request(self, request_element, soap_version):
+        authenticator = get_authenticator()
+        key = get_token_key(request_element, soap_version)
+        if key is None:
+            return authenticator.authenticate_request(request_element,
+                                                      soap_version)
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.AUTHENTICATION_CACHE.labels("hit").inc()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+        metrics.AUTHENTICATION_CACHE.labels("miss").inc()
+        try:
+            with metrics.AUTHENTICATION_LATENCY.time():
+                result = authenticator.authenticate_request(request_element,
+                                                            soap_version)
+        except get_negative_cache_errors() as err:
+            cache.set_error(key, err)
+            raise
+        cache.set_result(key, result)
+        return result
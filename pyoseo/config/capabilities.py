@@ -0,0 +1,121 @@
+"""Pre-rendered GetCapabilities responses.
+
+The capabilities document only depends on the ``OSEOSERVER_*`` settings, so
+each process renders it once per SOAP version at startup, by passing an
+anonymous GetCapabilities request to the OSEO endpoint. The responses are
+kept in the ``default`` cache, under keys that include a hash of the
+settings, and served by
+:class:`config.middleware.GetCapabilitiesCacheMiddleware` without building
+any pyxb objects.
+
+If the endpoint does not answer the anonymous request, for example because
+its authentication class requires credentials, nothing is cached and
+GetCapabilities requests are processed as usual.
+
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.urlresolvers import resolve
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.test import RequestFactory
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "default"
+
+SETTINGS_NAMES = (
+    "OSEOSERVER_COLLECTIONS",
+    "OSEOSERVER_PRODUCT_ORDER",
+    "OSEOSERVER_ONLINE_DATA_ACCESS_OPTIONS",
+    "OSEOSERVER_PROCESSING_OPTIONS",
+)
+
+SOAP_CONTENT_TYPES = {
+    "1.1": "text/xml",
+    "1.2": "application/soap+xml",
+}
+
+REQUEST_TEMPLATE = (
+    '<soap:Envelope xmlns:soap="{0}">'
+    '<soap:Body>'
+    '<oseo:GetCapabilities xmlns:oseo="{1}" service="OS"/>'
+    '</soap:Body>'
+    '</soap:Envelope>'
+)
+
+
+def get_settings_fingerprint():
+    """Return a hash of the settings that the capabilities depend on."""
+    values = [getattr(settings, name, None) for name in SETTINGS_NAMES]
+    serialized = json.dumps(values, sort_keys=True)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def get_cache_key(soap_version):
+    return "getcapabilities:{0}:{1}".format(soap_version,
+                                            get_settings_fingerprint())
+
+
+def get_cached_response(soap_version):
+    """Return the pre-rendered response for a SOAP version.
+
+    :return: A three-element tuple with the content, content type and ETag
+        of the response, or None if it has not been rendered
+    :rtype: (bytes, str, str)
+
+    """
+
+    return caches[CACHE_ALIAS].get(get_cache_key(soap_version))
+
+
+def render_responses():
+    """Render the GetCapabilities response for each SOAP version.
+
+    Database connections opened while rendering are closed afterwards, so
+    that a preloading gunicorn master does not share them with its workers.
+
+    """
+
+    try:
+        _render_responses()
+    finally:
+        connections.close_all()
+
+
+def _render_responses():
+    for namespace, soap_version in metrics.SOAP_VERSIONS.items():
+        try:
+            response = _render(namespace, soap_version)
+        except Exception:
+            logger.warning("Could not render the SOAP {0} GetCapabilities "
+                           "response".format(soap_version), exc_info=True)
+            continue
+        if response.status_code != 200 or response.streaming:
+            logger.warning("Not caching the SOAP {0} GetCapabilities "
+                           "response, the endpoint answered with status "
+                           "{1}".format(soap_version, response.status_code))
+            continue
+        content = response.content
+        etag = '"{0}"'.format(hashlib.sha1(content).hexdigest())
+        caches[CACHE_ALIAS].set(get_cache_key(soap_version),
+                                (content, response["Content-Type"], etag),
+                                None)
+
+
+def _render(namespace, soap_version):
+    path = reverse("oseo_endpoint")
+    body = REQUEST_TEMPLATE.format(namespace, metrics.OSEO_NAMESPACE)
+    request = RequestFactory().post(
+        path, data=body.encode("utf-8"),
+        content_type=SOAP_CONTENT_TYPES[soap_version]
+    )
+    match = resolve(path)
+    return match.func(request, *match.args, **match.kwargs)
@@ -1,8 +1,20 @@
 from __future__ import absolute_import
 import os
+import time
 
 from django.conf import settings
 from celery import Celery
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+from celery.signals import worker_init
+from prometheus_client import CollectorRegistry
+from prometheus_client import REGISTRY
+from prometheus_client import multiprocess
+from prometheus_client import start_http_server
+
+from . import metrics
+from . import responsecache  # invalidates cached responses on order changes
+from .warmup import warm_up
 
 
 #os.environ.setdefault("DJANGO_SETTINGS_MODULE", )
@@ -10,3 +22,53 @@ from celery import Celery
 app = Celery("oseoserver")
 app.config_from_object("django.conf:settings")
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@worker_init.connect
+def warm_up_worker(sender=None, **kwargs):
+    """Load the pyxb bindings before the pool processes are forked.
+
+    Every worker imports ``oseoserver.tasks``, and with it the bindings,
+    when its tasks are autodiscovered, whatever queues it consumes. Warming
+    up only makes sure that validation is configured and that the bindings
+    are shared by the pool processes instead of being built in each one.
+
+    """
+
+    warm_up()
+
+
+@worker_init.connect
+def start_metrics_server(sender=None, **kwargs):
+    """Expose the task metrics of the worker's pool processes.
+
+    Pool processes share their metrics through the directory named by the
+    ``prometheus_multiproc_dir`` environment variable, which must be set
+    for the metrics of prefork workers to be reported.
+
+    """
+
+    metrics_port = os.getenv("PYOSEO_WORKER_METRICS_PORT")
+    if metrics_port is not None:
+        registry = CollectorRegistry()
+        if os.getenv("prometheus_multiproc_dir") is not None:
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        start_http_server(int(metrics_port), registry=registry)
+
+
+_task_start_times = {}
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _task_start_times[task_id] = time.time()
+
+
+@task_postrun.connect
+def record_task_runtime(task_id=None, task=None, state=None, **kwargs):
+    start = _task_start_times.pop(task_id, None)
+    if start is not None:
+        metrics.TASK_RUNTIME.labels(task.name, state).observe(
+            time.time() - start)
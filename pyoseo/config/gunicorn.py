@@ -0,0 +1,68 @@
+"""Gunicorn configuration for pyoseo.
+
+Run the server with::
+
+    gunicorn --config config/gunicorn.py config.wsgi
+
+Settings can be adjusted with the ``PYOSEO_*`` environment variables below.
+
+"""
+
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("PYOSEO_BIND", "127.0.0.1:8000")
+workers = int(os.getenv("PYOSEO_WEB_WORKERS",
+                        multiprocessing.cpu_count() * 2 + 1))
+
+# threaded workers keep idle client connections open without blocking a
+# whole worker process, which sync workers cannot do. Each thread holds its
+# own persistent database connection
+worker_class = "gthread"
+threads = int(os.getenv("PYOSEO_WEB_THREADS", 4))
+keepalive = int(os.getenv("PYOSEO_WEB_KEEPALIVE", 5))
+
+# restart workers periodically in order to contain memory growth of the
+# pyxb object trees. The jitter prevents all workers restarting at once
+max_requests = int(os.getenv("PYOSEO_WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(max_requests * 0.1)
+
+# load the application, including the pyxb OGC bindings, in the master
+# process. Workers are forked from it and share its memory pages instead of
+# each importing their own copy. Code changes then require a full restart
+preload_app = os.getenv("PYOSEO_WEB_PRELOAD", "false").lower() == "true"
+
+# each worker process keeps its own prometheus metrics. They are written to
+# this directory so that /metrics reports the totals of all the workers. It
+# must be set before the workers import prometheus_client and must not be
+# shared with the celery workers
+metrics_dir = os.getenv(
+    "PYOSEO_WEB_METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "pyoseo-web-metrics")
+)
+os.environ["prometheus_multiproc_dir"] = metrics_dir
+
+timeout = int(os.getenv("PYOSEO_WEB_TIMEOUT", 120))
+graceful_timeout = 30
+backlog = 2048
+
+
+def when_ready(server):
+    # keep the preloaded objects away from the garbage collector, so that
+    # the workers do not end up copying the memory pages that hold them
+    if preload_app and hasattr(gc, "freeze"):
+        gc.freeze()
+
+
+def on_starting(server):
+    # discard the metrics left behind by a previous run
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
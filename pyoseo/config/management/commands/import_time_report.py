@@ -0,0 +1,103 @@
+"""Report how long it takes to import the modules that pyoseo needs.
+
+Each module is imported in a fresh python process, so that the time and
+memory reported include all of its dependencies. Modules are imported after
+``django.setup()``, which already imports the installed apps and most of
+their dependencies, so the total time, from importing django to having
+imported the module, is what the workers actually pay at startup and is the
+one that is checked against ``--max-seconds``.
+
+"""
+
+from __future__ import division
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODULES = [
+    "django",
+    "celery",
+    "lxml.etree",
+    "pyxb.bundles.wssplat.soap12",
+    "pyxb.bundles.wssplat.wsse",
+    "pyxb.bundles.opengis.oseo_1_0",
+    "oseoserver.tasks",
+    "config.wsgi",
+]
+
+MEASURE_SCRIPT = """
+import json, resource, time
+start = time.time()
+import django
+django.setup()
+setup = time.time()
+__import__({module!r})
+end = time.time()
+print(json.dumps({{
+    "setup": setup - start,
+    "import": end - setup,
+    "total": end - start,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+
+def measure(module, settings_module):
+    """Import the module in a new process and return its measurements."""
+    command = [sys.executable, "-c", MEASURE_SCRIPT.format(module=module)]
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    logger.debug("command: {}".format(command))
+    output = subprocess.check_output(command, env=environment,
+                                     cwd=settings.BASE_DIR)
+    return json.loads(output.decode("utf-8").splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES,
+                            help="Modules to import. Defaults to the "
+                                 "modules that pyoseo's web and celery "
+                                 "workers load")
+        parser.add_argument("--max-seconds", type=float,
+                            help="Fail if setting up django and importing "
+                                 "any module takes longer than this")
+
+    def handle(self, *args, **options):
+        max_seconds = options["max_seconds"]
+        self.stdout.write("{0:<40} {1:>10} {2:>10} {3:>10} {4:>12}".format(
+            "module", "setup (s)", "import (s)", "total (s)",
+            "max RSS (MB)"))
+        failed = []
+        slow = []
+        for module in options["modules"]:
+            try:
+                result = measure(module, settings.SETTINGS_MODULE)
+            except subprocess.CalledProcessError:
+                self.stdout.write("{0:<40} {1:>10}".format(module, "failed"))
+                failed.append(module)
+                continue
+            self.stdout.write(
+                "{0:<40} {1:>10.2f} {2:>10.2f} {3:>10.2f} {4:>12.1f}".format(
+                    module, result["setup"], result["import"],
+                    result["total"], result["max_rss_kb"] / 1024))
+            if max_seconds is not None and result["total"] > max_seconds:
+                slow.append(module)
+        errors = []
+        if failed:
+            errors.append("Modules that could not be imported: {0}".format(
+                ", ".join(failed)))
+        if slow:
+            errors.append("Modules over the limit: {0}".format(
+                ", ".join(slow)))
+        if errors:
+            raise CommandError(". ".join(errors))
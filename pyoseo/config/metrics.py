@@ -0,0 +1,261 @@
+"""Prometheus metrics for pyoseo.
+
+The web server exposes them at ``/metrics``. Celery workers expose them on
+the port given by the ``PYOSEO_WORKER_METRICS_PORT`` environment variable.
+
+When the ``prometheus_multiproc_dir`` environment variable is set, each
+process writes its metrics to that directory and ``/metrics`` reports the
+totals of all the processes, instead of those of whichever gunicorn worker
+happens to serve the scrape.
+
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from lxml import etree
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.core import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SOAP_VERSIONS = {
+    "http://schemas.xmlsoap.org/soap/envelope/": "1.1",
+    "http://www.w3.org/2003/05/soap-envelope": "1.2",
+}
+
+OSEO_NAMESPACE = "http://www.opengis.net/oseo/1.0"
+
+# requests for anything else are labelled as "other", so that clients
+# cannot create an unbounded number of time series
+OSEO_OPERATIONS = frozenset([
+    "GetCapabilities",
+    "GetOptions",
+    "GetQuotation",
+    "Submit",
+    "GetStatus",
+    "DescribeResultAccess",
+    "Cancel",
+])
+
+# counting orders by status scans the order tables, so the counts are
+# refreshed at most this often, in seconds
+ORDER_STATUS_INTERVAL = 60
+
+OSEO_REQUESTS = Counter(
+    "pyoseo_requests_total",
+    "OSEO requests received",
+    ["operation", "soap_version", "status_code"]
+)
+OSEO_REQUEST_LATENCY = Histogram(
+    "pyoseo_request_latency_seconds",
+    "Time spent processing OSEO requests",
+    ["operation", "soap_version"]
+)
+AUTHENTICATION_LATENCY = Histogram(
+    "pyoseo_authentication_latency_seconds",
+    "Time spent in the custom authentication class"
+)
+AUTHENTICATION_CACHE = Counter(
+    "pyoseo_authentication_cache_total",
+    "Lookups in the authentication cache",
+    ["result"]
+)
+RESPONSE_CACHE = Counter(
+    "pyoseo_response_cache_total",
+    "Lookups in the GetStatus response cache",
+    ["result"]
+)
+PRODUCT_CACHE = Counter(
+    "pyoseo_product_cache_total",
+    "Lookups in the shared product cache",
+    ["result"]
+)
+TASK_RUNTIME = Histogram(
+    "pyoseo_task_runtime_seconds",
+    "Time spent running celery tasks",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600,
+             float("inf"))
+)
+
+
+def get_soap_request_info(body):
+    """Find out the OSEO operation and SOAP version of a request.
+
+    Only the beginning of the request is parsed, up to the first element
+    inside the SOAP Body.
+
+    :arg body: The raw request
+    :type body: bytes
+    :return: A two-element tuple with the operation and SOAP version. They
+        are None if the request is not a SOAP request. The operation is
+        "other" if the SOAP Body does not hold a known OSEO request
+    :rtype: (str, str)
+
+    """
+
+    soap_version = None
+    soap_namespace = None
+    inside_body = False
+    try:
+        for _, element in etree.iterparse(io.BytesIO(body),
+                                          events=("start",)):
+            qname = etree.QName(element)
+            if soap_version is None:
+                soap_version = SOAP_VERSIONS.get(qname.namespace)
+                if soap_version is None:
+                    break
+                soap_namespace = qname.namespace
+            elif inside_body:
+                if (qname.namespace == OSEO_NAMESPACE and
+                        qname.localname in OSEO_OPERATIONS):
+                    return qname.localname, soap_version
+                return "other", soap_version
+            elif (qname.namespace == soap_namespace and
+                  qname.localname == "Body"):
+                inside_body = True
+    except etree.XMLSyntaxError:
+        pass
+    if soap_version is not None:
+        return "other", soap_version
+    return None, None
+
+
+class QueueDepthCollector(object):
+    """Report the number of messages waiting in each celery queue."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from config.celery import app
+        metric = GaugeMetricFamily("pyoseo_queue_depth",
+                                   "Messages waiting in each celery queue",
+                                   labels=["queue"])
+        try:
+            with app.connection() as connection:
+                for queue in settings.CELERY_QUEUES:
+                    message_count = _get_message_count(connection,
+                                                       queue.name)
+                    if message_count is not None:
+                        metric.add_metric([queue.name], message_count)
+        except Exception:
+            logger.warning("Could not connect to the celery broker",
+                           exc_info=True)
+            return
+        yield metric
+
+
+def _get_message_count(connection, queue_name):
+    # a failed passive declare closes the channel on amqp, so each queue
+    # gets its own
+    channel = connection.channel()
+    try:
+        return channel.queue_declare(queue=queue_name,
+                                     passive=True).message_count
+    except Exception:
+        logger.warning("Could not get the depth of the {0} queue".format(
+            queue_name), exc_info=True)
+        return None
+    finally:
+        try:
+            channel.close()
+        except Exception:
+            pass
+
+
+class OrderStatusCollector(object):
+    """Report the number of orders and order items in each status.
+
+    The counts are cached for ``ORDER_STATUS_INTERVAL`` seconds, so that
+    frequent scrapes do not keep the database busy.
+
+    """
+
+    def __init__(self):
+        self._counts = None
+        self._collected_at = None
+        self._lock = threading.Lock()
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        with self._lock:
+            now = time.time()
+            if (self._collected_at is None or
+                    now - self._collected_at >= ORDER_STATUS_INTERVAL):
+                try:
+                    self._counts = self._get_counts()
+                except Exception:
+                    logger.warning("Could not count the orders by status",
+                                   exc_info=True)
+                    self._counts = None
+                self._collected_at = now
+            counts = self._counts
+        for name, statuses in counts or []:
+            metric = GaugeMetricFamily(
+                "pyoseo_{0}".format(name),
+                "Number of {0} in each status".format(
+                    name.replace("_", " ")),
+                labels=["status"]
+            )
+            for status, total in statuses:
+                metric.add_metric([status], total)
+            yield metric
+
+    @staticmethod
+    def _get_counts():
+        from django.db.models import Count
+        from oseoserver import models
+        counts = []
+        for name, model in (("orders", models.Order),
+                            ("order_items", models.OrderItem)):
+            totals = model.objects.values("status").annotate(
+                total=Count("id"))
+            counts.append(
+                (name, [(item["status"], item["total"]) for item in totals]))
+        return counts
+
+
+_collectors = []
+
+
+def register_collectors():
+    """Register the collectors that query the broker and the database."""
+    if not _collectors:
+        _collectors.extend([QueueDepthCollector(), OrderStatusCollector()])
+        for collector in _collectors:
+            REGISTRY.register(collector)
+
+
+def export_metrics(request):
+    """Django view that exposes the metrics to Prometheus.
+
+    In multiprocess mode the metrics of all processes are read from the
+    ``prometheus_multiproc_dir`` directory. The broker and database
+    collectors are added once, by the process that serves the scrape.
+
+    """
+
+    if os.getenv("prometheus_multiproc_dir") is not None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _collectors:
+            registry.register(collector)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,256 @@
+"""Custom middleware for pyoseo."""
+
+import cProfile
+import io
+import json
+import os
+import random
+import time
+import uuid
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.http import HttpResponseBadRequest
+from django.http import HttpResponseNotModified
+
+from . import capabilities
+from . import metrics
+from . import responsecache
+
+# Upper limit for the size of a decompressed request body, in bytes
+DEFAULT_MAX_DECOMPRESSED_REQUEST_SIZE = 100 * 1024 * 1024
+
+
+class CompressedRequestMiddleware(object):
+    """Decompress request bodies that are sent with gzip or deflate encoding.
+
+    This allows clients to compress large requests, like Submit requests
+    with many order items. The view gets the decompressed body, just like
+    with any other request.
+
+    """
+
+    window_bits = {
+        "gzip": 16 + zlib.MAX_WBITS,
+        "deflate": zlib.MAX_WBITS,
+    }
+
+    def process_request(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").lower()
+        wbits = self.window_bits.get(encoding)
+        if wbits is None:
+            return None
+        max_size = getattr(settings, "MAX_DECOMPRESSED_REQUEST_SIZE",
+                           DEFAULT_MAX_DECOMPRESSED_REQUEST_SIZE)
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            body = decompressor.decompress(request.body, max_size)
+        except zlib.error:
+            return HttpResponseBadRequest(
+                "Could not decompress {0} encoded request".format(encoding))
+        if decompressor.unconsumed_tail:
+            return HttpResponse("Decompressed request is too large",
+                                status=413)
+        if not _stream_ended(decompressor):
+            return HttpResponseBadRequest(
+                "Truncated {0} encoded request".format(encoding))
+        request._body = body
+        request._stream = io.BytesIO(body)
+        request.META["CONTENT_LENGTH"] = str(len(body))
+        del request.META["HTTP_CONTENT_ENCODING"]
+        return None
+
+
+def _stream_ended(decompressor):
+    try:
+        return decompressor.eof
+    except AttributeError:  # python 2 decompressors have no eof attribute
+        # once the stream has ended, any further input is left unused
+        sentinel = b"\x00"
+        try:
+            decompressor.decompress(sentinel)
+        except zlib.error:
+            return False
+        return decompressor.unused_data.endswith(sentinel)
+
+
+class OseoMetricsMiddleware(object):
+    """Record the number and latency of OSEO requests.
+
+    Requests are labelled with their OSEO operation and SOAP version.
+
+    """
+
+    def process_request(self, request):
+        if request.method == "POST":
+            request.oseo_metrics = metrics.get_soap_request_info(
+                request.body) + (time.time(),)
+        return None
+
+    def process_response(self, request, response):
+        operation, soap_version, start = getattr(
+            request, "oseo_metrics", (None, None, None))
+        if operation is not None:
+            metrics.OSEO_REQUEST_LATENCY.labels(
+                operation, soap_version).observe(time.time() - start)
+            metrics.OSEO_REQUESTS.labels(
+                operation, soap_version, str(response.status_code)).inc()
+        return response
+
+
+class GetCapabilitiesCacheMiddleware(object):
+    """Serve GetCapabilities requests with the pre-rendered responses.
+
+    Responses carry an ``ETag`` and requests with a matching
+    ``If-None-Match`` header get a 304 response. It must come after
+    :class:`OseoMetricsMiddleware`, which finds out the request's operation.
+    See :mod:`config.capabilities` for how the responses are rendered.
+
+    """
+
+    def process_request(self, request):
+        operation, soap_version, _ = getattr(
+            request, "oseo_metrics", (None, None, None))
+        if operation != "GetCapabilities":
+            return None
+        cached = capabilities.get_cached_response(soap_version)
+        if cached is None:
+            return None
+        content, content_type, etag = cached
+        if etag in _get_if_none_match(request):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        return response
+
+
+class GetStatusCacheMiddleware(object):
+    """Serve repeated GetStatus requests from the shared response cache.
+
+    It must come after :class:`OseoMetricsMiddleware`, which finds out the
+    request's operation. See :mod:`config.responsecache` for how cached
+    responses are invalidated.
+
+    """
+
+    def process_request(self, request):
+        # only GetStatus requests, which are small, are parsed in full
+        operation = getattr(request, "oseo_metrics", (None,))[0]
+        if operation != "GetStatus":
+            return None
+        key = responsecache.get_request_key(request.body)
+        if key is None:
+            return None
+        cached = responsecache.get_response_cache().get(key)
+        if cached is None:
+            metrics.RESPONSE_CACHE.labels("miss").inc()
+            request.response_cache_key = key
+            return None
+        metrics.RESPONSE_CACHE.labels("hit").inc()
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def process_response(self, request, response):
+        key = getattr(request, "response_cache_key", None)
+        if (key is not None and response.status_code == 200 and
+                not response.streaming):
+            responsecache.get_response_cache().set(
+                key, (response.content, response["Content-Type"]))
+        return response
+
+
+def _get_if_none_match(request):
+    # GZipMiddleware adds ";gzip" to the ETags of the responses it compresses
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return [tag.strip().replace(";gzip", "") for tag in header.split(",")]
+
+
+class ProfilingMiddleware(object):
+    """Profile the processing of selected requests.
+
+    Requests are profiled when they include the header named in the
+    ``PYOSEO_PROFILING`` setting or when they are picked by its
+    ``sample_rate``. For each profiled request, the cProfile stats are saved
+    to ``<id>.prof`` and a summary with the number and duration of database
+    queries is saved to ``<id>.json`` in the configured ``output_dir``. The
+    id is returned in the response's ``X-Pyoseo-Profile-Id`` header.
+
+    When profiling is not enabled this middleware removes itself from the
+    middleware chain, so it adds no overhead.
+
+    """
+
+    def __init__(self):
+        config = getattr(settings, "PYOSEO_PROFILING", {})
+        if not config.get("enabled", False):
+            raise MiddlewareNotUsed()
+        self.header = "HTTP_{0}".format(
+            config.get("header", "X-Pyoseo-Profile").upper().replace(
+                "-", "_"))
+        self.sample_rate = config.get("sample_rate", 0)
+        self.output_dir = config["output_dir"]
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.header not in request.META and (
+                random.random() >= self.sample_rate):
+            return None
+        # the view is left to django, so that exceptions still reach the
+        # process_exception methods of the other middleware
+        request.pyoseo_profile = {
+            "id": "{0}-{1}".format(time.strftime("%Y%m%dT%H%M%S"),
+                                   uuid.uuid4().hex[:8]),
+            "profiler": cProfile.Profile(),
+            "force_debug_cursor": connection.force_debug_cursor,
+            "start": time.time(),
+        }
+        connection.force_debug_cursor = True
+        connection.queries_log.clear()
+        request.pyoseo_profile["profiler"].enable()
+        return None
+
+    def process_exception(self, request, exception):
+        self.stop_profiling(request)
+        return None
+
+    def process_response(self, request, response):
+        profile = getattr(request, "pyoseo_profile", None)
+        if profile is None:
+            return response
+        self.stop_profiling(request)
+        self.save_profile(profile["id"], request, profile["profiler"],
+                          profile["queries"], profile["elapsed"])
+        response["X-Pyoseo-Profile-Id"] = profile["id"]
+        return response
+
+    @staticmethod
+    def stop_profiling(request):
+        profile = getattr(request, "pyoseo_profile", None)
+        if profile is None or "elapsed" in profile:
+            return
+        profile["profiler"].disable()
+        profile["elapsed"] = time.time() - profile["start"]
+        profile["queries"] = connection.queries
+        connection.force_debug_cursor = profile["force_debug_cursor"]
+
+    def save_profile(self, profile_id, request, profiler, queries, elapsed):
+        base_path = os.path.join(self.output_dir, profile_id)
+        profiler.dump_stats("{0}.prof".format(base_path))
+        operation, soap_version, _ = getattr(
+            request, "oseo_metrics", (None, None, None))
+        summary = {
+            "path": request.path,
+            "operation": operation,
+            "soap_version": soap_version,
+            "elapsed": elapsed,
+            "query_count": len(queries),
+            "query_time": sum(float(query["time"]) for query in queries),
+            "queries": queries,
+        }
+        with open("{0}.json".format(base_path), "w") as fh:
+            json.dump(summary, fh, indent=4)
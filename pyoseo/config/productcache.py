@@ -0,0 +1,274 @@
+"""A cache of prepared products that is shared across orders.
+
+Custom item processors can use it in order to avoid retrieving and
+processing the same product again when another order asks for it with the
+same options:
+
+.. code:: python
+
+   from config.productcache import get_product_cache
+
+   cache = get_product_cache()
+   key = cache.get_key(collection, identifier, options)
+   paths = cache.fetch(key, destination_dir)
+   if paths is None:
+       paths = retrieve_and_process(...)
+       cache.store(key, paths)
+
+Alternatively, point the ``item_processor`` of the ``OSEOSERVER_PRODUCT_ORDER``
+setting to ``config.productcache.CachingItemProcessor`` and move the real item
+processor to ``OSEOSERVER_CACHED_ITEM_PROCESSOR``.
+
+Cached files are hard linked into the destination directory, so serving a
+repeated order does not copy any data. The cache is configured with the
+``OSEOSERVER_PRODUCT_CACHE`` setting.
+
+"""
+
+from __future__ import division
+import errno
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.six.moves.urllib.parse import urlparse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCache(object):
+    """Content addressed cache of product files.
+
+    Each entry is a directory named after the hash of the product's
+    collection, identifier and processing options. Entries older than
+    ``max_age_days`` are removed and, when the cache grows beyond
+    ``max_bytes``, the least recently used entries are evicted.
+
+    Evicting walks the whole cache directory, so storing a product only
+    triggers it when ``eviction_interval`` seconds have passed since the
+    last time. The cache may temporarily grow beyond ``max_bytes`` in
+    between.
+
+    """
+
+    def __init__(self, directory, max_bytes, max_age_days,
+                 eviction_interval=300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.eviction_interval = eviction_interval
+        self.hits = 0
+        self.misses = 0
+        self._last_eviction = None
+
+    @staticmethod
+    def get_key(collection, identifier, options=None):
+        serialized = json.dumps([collection, identifier, options or {}],
+                                sort_keys=True)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key, destination_dir):
+        """Link the cached files of a product into the destination directory.
+
+        :return: The paths of the linked files or None, if the product is
+            not in the cache
+        :rtype: list
+
+        """
+
+        entry_path = self.get_entry_path(key)
+        paths = []
+        try:
+            names = sorted(os.listdir(entry_path))
+            os.utime(entry_path, None)  # mark it as recently used
+            for name in names:
+                destination = os.path.join(destination_dir, name)
+                _link_or_copy(os.path.join(entry_path, name), destination)
+                paths.append(destination)
+        except (OSError, IOError):
+            # the entry is missing or it was evicted while being linked
+            for path in paths:
+                os.remove(path)
+            self._record_lookup(key, "miss")
+            return None
+        self._record_lookup(key, "hit")
+        return paths
+
+    def store(self, key, paths):
+        """Add the files of a product to the cache."""
+        entry_path = self.get_entry_path(key)
+        parent_dir = os.path.dirname(entry_path)
+        try:
+            os.makedirs(parent_dir)
+        except OSError as err:  # it may have been created concurrently
+            if err.errno != errno.EEXIST:
+                raise
+        # build the entry in a temporary directory and rename it, so that
+        # concurrent readers never see a partial entry
+        temporary_dir = tempfile.mkdtemp(dir=parent_dir)
+        for path in paths:
+            _link_or_copy(path, os.path.join(temporary_dir,
+                                             os.path.basename(path)))
+        try:
+            os.rename(temporary_dir, entry_path)
+        except OSError:  # another process has already stored the product
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+        now = time.time()
+        if (self._last_eviction is None or
+                now - self._last_eviction >= self.eviction_interval):
+            self.evict()
+
+    def evict(self):
+        """Remove expired entries and enforce the maximum cache size."""
+        self._last_eviction = time.time()
+        entries = []
+        total_bytes = 0
+        oldest_allowed = time.time() - self.max_age_days * 24 * 60 * 60
+        for entry_path in self._get_entry_paths():
+            # other processes may be evicting the same entries
+            try:
+                last_used = os.stat(entry_path).st_mtime
+                if last_used < oldest_allowed:
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                    continue
+                size = _get_directory_size(entry_path)
+            except OSError:
+                continue
+            entries.append((last_used, size, entry_path))
+            total_bytes += size
+        for last_used, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+
+    def _record_lookup(self, key, result):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.PRODUCT_CACHE.labels(result).inc()
+        logger.debug("product cache {0} for {1}".format(result, key))
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def _get_entry_paths(self):
+        if not os.path.isdir(self.directory):
+            return
+        for prefix in os.listdir(self.directory):
+            prefix_path = os.path.join(self.directory, prefix)
+            try:
+                names = os.listdir(prefix_path)
+            except OSError:
+                continue
+            for name in names:
+                entry_path = os.path.join(prefix_path, name)
+                if name[:2] == prefix and len(name) == 64:
+                    yield entry_path
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:  # different filesystems, or no hard link support
+        shutil.copy2(source, destination)
+
+
+def _get_directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path))
+
+
+_product_cache = None
+
+
+def get_product_cache():
+    """Return the process wide product cache, as configured in the settings.
+
+    Cached products do not outlive ``item_availability_days`` of the
+    ``OSEOSERVER_PRODUCT_ORDER`` setting, unless ``max_age_days`` is set.
+
+    """
+
+    global _product_cache
+    if _product_cache is None:
+        cache_settings = settings.OSEOSERVER_PRODUCT_CACHE
+        max_age_days = cache_settings.get(
+            "max_age_days",
+            settings.OSEOSERVER_PRODUCT_ORDER["item_availability_days"]
+        )
+        _product_cache = ProductCache(
+            directory=cache_settings["directory"],
+            max_bytes=cache_settings["max_bytes"],
+            max_age_days=max_age_days,
+            eviction_interval=cache_settings.get("eviction_interval", 300)
+        )
+    return _product_cache
+
+
+class CachingItemProcessor(object):
+    """Item processor that reuses the products prepared for earlier orders.
+
+    It wraps the processor named in the ``OSEOSERVER_CACHED_ITEM_PROCESSOR``
+    setting. Order items for a product that has already been prepared with
+    the same options and packaging get the cached files, linked into their
+    own directory, instead of being processed again. Everything else is
+    delegated to the wrapped processor, which must also provide:
+
+    * ``get_item_directory(order_id, item_id, user_name)``, the directory
+      where the files of an order item are delivered
+    * ``get_file_url(path)``, the URL for one of the delivered files
+
+    """
+
+    def __init__(self, **kwargs):
+        processor_class = import_string(
+            settings.OSEOSERVER_CACHED_ITEM_PROCESSOR)
+        self.processor = processor_class(**kwargs)
+
+    def __getattr__(self, name):
+        if name == "processor":  # not set yet, avoid infinite recursion
+            raise AttributeError(name)
+        return getattr(self.processor, name)
+
+    def process_item_online_access(self, identifier, item_id, order_id,
+                                   user_name, packaging, options,
+                                   delivery_options, **kwargs):
+        cache = get_product_cache()
+        key = cache.get_key(None, identifier,
+                            {"options": options, "packaging": packaging})
+        item_dir = self.processor.get_item_directory(order_id, item_id,
+                                                     user_name)
+        if not os.path.isdir(item_dir):
+            os.makedirs(item_dir)
+        paths = cache.fetch(key, item_dir)
+        if paths is not None:
+            return [self.processor.get_file_url(path) for path in paths]
+        urls = self.processor.process_item_online_access(
+            identifier, item_id, order_id, user_name, packaging, options,
+            delivery_options, **kwargs)
+        paths = [
+            os.path.join(item_dir, posixpath.basename(urlparse(url).path))
+            for url in urls
+        ]
+        try:
+            cache.store(key, paths)
+        except (OSError, IOError):  # the item is ready, even if not cached
+            logger.warning("Could not add {0} to the product cache".format(
+                identifier), exc_info=True)
+        return urls
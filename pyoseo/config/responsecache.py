@@ -0,0 +1,183 @@
+"""Shared cache of GetStatus responses.
+
+Clients poll GetStatus much more often than their orders change. The
+serialized responses are kept in the ``responses`` cache, which is shared by
+all web server processes, and reused until the order changes.
+
+Each order has a generation token that is part of the cache keys of its
+responses. Whenever an existing order, or one of its batches or order items,
+is saved or deleted the token is replaced, which invalidates every cached
+response for the order at once. The orders that a transaction changes are
+collected and their tokens are replaced together, with a single round trip to
+redis, once the transaction is committed. Changes made with
+``QuerySet.update()`` do not send signals, so cached responses also expire
+after the cache's ``TIMEOUT``.
+
+Errors talking to redis are ignored by django-redis, as configured by the
+``DJANGO_REDIS_IGNORE_EXCEPTIONS`` setting, so requests are processed
+without the cache when redis is unavailable.
+
+Cache keys include a hash of the request's WS-Security UsernameToken, so a
+response is only reused for requests that carry the same credentials as the
+one that produced it. Revoked credentials keep getting cached responses
+until those expire.
+
+"""
+
+import uuid
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from lxml import etree
+
+from . import metrics
+from .auth import get_token_key
+
+CACHE_ALIAS = "responses"
+
+OSEO_NAMESPACE = "http://www.opengis.net/oseo/1.0"
+
+# generation tokens must outlive the responses that use them, otherwise an
+# expired token would be replaced and orphan fresh responses
+GENERATION_TIMEOUT = 24 * 60 * 60
+
+
+def get_response_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_order_generation(order_id):
+    key = "order-generation:{0}".format(order_id)
+    return get_response_cache().get_or_set(key, uuid.uuid4().hex,
+                                           GENERATION_TIMEOUT)
+
+
+def invalidate_order(order_id):
+    invalidate_orders([order_id])
+
+
+def invalidate_orders(order_ids):
+    get_response_cache().set_many(
+        dict(("order-generation:{0}".format(order_id), uuid.uuid4().hex)
+             for order_id in order_ids),
+        GENERATION_TIMEOUT
+    )
+
+
+def get_request_key(body):
+    """Return the cache key for a GetStatus request.
+
+    :arg body: The raw request
+    :type body: bytes
+    :return: The cache key or None, if the request cannot be cached. Only
+        GetStatus requests for a single order are cached. Responses are
+        cached per order, presentation, SOAP version and user token
+    :rtype: str
+
+    """
+
+    try:
+        envelope = etree.fromstring(body)
+    except etree.XMLSyntaxError:
+        return None
+    soap_version = metrics.SOAP_VERSIONS.get(etree.QName(envelope).namespace)
+    if soap_version is None:
+        return None
+    get_status = envelope.find(
+        "{{{0}}}Body/{{{1}}}GetStatus".format(etree.QName(envelope).namespace,
+                                              OSEO_NAMESPACE))
+    if get_status is None:
+        return None
+    order_id = get_status.findtext("{{{0}}}orderId".format(OSEO_NAMESPACE))
+    if order_id is None:
+        return None
+    presentation = get_status.findtext(
+        "{{{0}}}presentation".format(OSEO_NAMESPACE), default="brief")
+    return "getstatus:{0}:{1}:{2}:{3}:{4}".format(
+        order_id.strip(),
+        get_order_generation(order_id.strip()),
+        presentation.strip(),
+        soap_version,
+        get_token_key(envelope, soap_version)
+    )
+
+
+class PendingInvalidations(object):
+    """Orders changed by the current transaction, invalidated on commit."""
+
+    def __init__(self):
+        self.order_ids = set()
+        self.batch_orders = {}  # order id of each batch, to avoid queries
+
+    def __call__(self):
+        if self.order_ids:
+            invalidate_orders(self.order_ids)
+
+
+def _get_models():
+    return (apps.get_model("oseoserver", "Order"),
+            apps.get_model("oseoserver", "Batch"),
+            apps.get_model("oseoserver", "OrderItem"))
+
+
+def _get_pending_invalidations(using):
+    """Return the invalidations of the current transaction.
+
+    They are registered with ``transaction.on_commit`` when the transaction
+    changes its first order. Django discards them when the transaction, or
+    the savepoint they were registered in, is rolled back.
+
+    """
+
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, "pyoseo_pending_invalidations", None)
+    registered = any(func is pending for _, func in connection.run_on_commit)
+    if pending is None or not registered:
+        pending = PendingInvalidations()
+        connection.pyoseo_pending_invalidations = pending
+        transaction.on_commit(pending, using=using)
+    return pending
+
+
+def _get_order_id(instance, batch_orders):
+    order_model, batch_model, item_model = _get_models()
+    if isinstance(instance, order_model):
+        return instance.pk
+    elif isinstance(instance, batch_model):
+        return instance.order_id
+    elif isinstance(instance, item_model):
+        # order items are usually saved through their batch, which is then
+        # already cached on the instance. Otherwise query for it once per
+        # batch and transaction
+        batch_field = instance._meta.get_field("batch")
+        batch = getattr(instance, batch_field.get_cache_name(), None)
+        if batch is not None:
+            return batch.order_id
+        if instance.batch_id not in batch_orders:
+            batch_orders[instance.batch_id] = batch_model.objects.filter(
+                pk=instance.batch_id).values_list(
+                    "order_id", flat=True).first()
+        return batch_orders[instance.batch_id]
+    return None
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_changed_order(sender, instance, created=False, using=None,
+                             **kwargs):
+    # new orders have no cached responses yet
+    if created or not issubclass(sender, _get_models()):
+        return
+    if transaction.get_connection(using).in_atomic_block:
+        pending = _get_pending_invalidations(using)
+        order_id = _get_order_id(instance, pending.batch_orders)
+        if order_id is not None:
+            pending.order_ids.add(order_id)
+    else:
+        order_id = _get_order_id(instance, {})
+        if order_id is not None:
+            invalidate_order(order_id)
@@ -12,17 +12,26 @@ import os
 
 from django.core.exceptions import ImproperlyConfigured
 from celery.schedules import crontab
+from kombu import Queue
 import pathlib2
 
 
-def get_environment_variable(var_name, mandatory=False):
-    value = os.getenv(var_name)
+def get_environment_variable(var_name, mandatory=False, default=None):
+    value = os.getenv(var_name, default)
     if value is None and mandatory:
         error_msg = "Set the {0} environment variable".format(var_name)
         #raise ImproperlyConfigured(error_msg)
     return value or "Could not set {0}".format(var_name)
 
 
+def get_required_environment_variable(var_name):
+    value = os.getenv(var_name)
+    if value is None:
+        raise ImproperlyConfigured(
+            "Set the {0} environment variable".format(var_name))
+    return value
+
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = str(pathlib2.Path(__file__).parents[2])
 
@@ -51,10 +60,20 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'mailqueue',  # required by oseoserver
     'oseoserver',
+    'config',  # management commands
 ]
 
+# django_prometheus is not an installed app: its middleware works without it
+# and its app config queries the database for migrations on every startup.
+# /metrics is served by config.metrics.export_metrics
 MIDDLEWARE_CLASSES = [
+    'django_prometheus.middleware.PrometheusBeforeMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
+    'config.middleware.CompressedRequestMiddleware',
+    'config.middleware.OseoMetricsMiddleware',
+    'config.middleware.GetCapabilitiesCacheMiddleware',
+    'config.middleware.GetStatusCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,6 +81,8 @@ MIDDLEWARE_CLASSES = [
     'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'django_prometheus.middleware.PrometheusAfterMiddleware',
+    'config.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -95,6 +116,35 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.9/topics/cache/
+
+CACHES = {
+    # per process, holds the pre-rendered GetCapabilities responses. See
+    # config.capabilities
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pyoseo",
+    },
+    # GetStatus responses, shared by all processes. See config.responsecache
+    "responses": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": get_environment_variable(
+            "PYOSEO_RESPONSE_CACHE_URL", default="redis://127.0.0.1:6379/1"),
+        "TIMEOUT": 300,
+        "KEY_PREFIX": "pyoseo",
+        "OPTIONS": {
+            "SOCKET_CONNECT_TIMEOUT": 1,
+            "SOCKET_TIMEOUT": 1,
+        },
+    },
+}
+
+# an unavailable redis server turns every lookup in the responses cache into
+# a miss instead of failing the request
+DJANGO_REDIS_IGNORE_EXCEPTIONS = True
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -179,19 +229,135 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_REDIRECT_STDOUTS = True
 CELERY_HIJACK_ROOT_LOGGER = False
 CELERY_DISABLE_RATE_LIMITS = True
+# order items take minutes to process, so each worker process reserves only
+# the task it is running. This lets the item tasks of a batch spread across
+# all available workers instead of being prefetched by the first one
+CELERYD_PREFETCH_MULTIPLIER = 1
+
+# Tasks are split into queues so that slow order item processing cannot
+# starve the fast tasks that update orders and notify users. Run dedicated
+# workers for each queue (see the installation docs)
+CELERY_DEFAULT_QUEUE = "control"
+CELERY_QUEUES = (
+    Queue("control", routing_key="control"),
+    Queue("processing", routing_key="processing"),
+    Queue("notifications", routing_key="notifications"),
+    Queue("housekeeping", routing_key="housekeeping"),
+)
+CELERY_ROUTES = {
+    "oseoserver.tasks.process_normal_order": {"queue": "control"},
+    "oseoserver.tasks.process_batch": {"queue": "control"},
+    "oseoserver.tasks.update_order_status": {"queue": "control"},
+    "oseoserver.tasks.process_online_data_access_item": {
+        "queue": "processing"},
+    "oseoserver.tasks.process_online_data_delivery_item": {
+        "queue": "processing"},
+    "oseoserver.tasks.process_media_delivery_item": {"queue": "processing"},
+    # django-mail-queue registers its task under this name, not under the
+    # module path
+    "tasks.send_mail": {"queue": "notifications"},
+    "oseoserver.tasks.monitor_ftp_downloads": {"queue": "housekeeping"},
+    "oseoserver.tasks.delete_expired_order_items": {"queue": "housekeeping"},
+    "oseoserver.tasks.delete_failed_orders": {"queue": "housekeeping"},
+}
+
+# item processing tasks are acknowledged only after they finish, so that
+# they are redelivered if a worker dies while processing them. Other tasks,
+# like e-mail sending and order dispatch, are not safe to run twice and keep
+# being acknowledged when they start
+_late_ack = {"acks_late": True}
+CELERY_ANNOTATIONS = {
+    "oseoserver.tasks.process_online_data_access_item": _late_ack,
+    "oseoserver.tasks.process_online_data_delivery_item": _late_ack,
+    "oseoserver.tasks.process_media_delivery_item": _late_ack,
+}
+
+# Cleanup tasks run often so that each run only has a small amount of
+# expired items and failed orders to delete. A run that could not start
+# before the next one is due is discarded instead of piling up in the queue
+HOUSEKEEPING_INTERVAL = 15 * 60  # seconds
 
 CELERYBEAT_SCHEDULE = {
     "delete_expired_order_items": {
         "task": "oseoserver.tasks.delete_expired_order_items",
-        "schedule": crontab(hour=10, minute=30)  # execute daily at 10h30
+        # execute every 15 minutes
+        "schedule": crontab(minute="*/15"),
+        "options": {"expires": HOUSEKEEPING_INTERVAL},
     },
     "delete_failed_orders": {
         "task": "oseoserver.tasks.delete_failed_orders",
-        "schedule": crontab(hour=11, minute=30)  # execute daily at 11h30
+        # execute every 15 minutes, offset from the previous task
+        "schedule": crontab(minute="7-59/15"),
+        "options": {"expires": HOUSEKEEPING_INTERVAL},
     },
 }
 
+# Validate requests and responses against the OSEO, SOAP and WS-Security
+# schemas. Each web and celery worker process loads the schema bindings once
+# when it starts
+PYXB_VALIDATION = {
+    "parsing": True,
+    "generating": True,
+}
+
+# Profile requests that carry the `X-Pyoseo-Profile` header, plus a random
+# `sample_rate` fraction of all requests. Results are saved to `output_dir`.
+# Inspect them with python's pstats module or a viewer such as snakeviz
+PYOSEO_PROFILING = {
+    "enabled": False,
+    "header": "X-Pyoseo-Profile",
+    "sample_rate": 0,
+    "output_dir": os.path.join(BASE_DIR, "profiles"),
+}
+
 MAILQUEUE_CELERY = True
 
 SENDFILE_BACKEND = "sendfile.backends.simple"
 
+
+# oseoserver settings
+
+OSEOSERVER_PRODUCT_ORDER = {
+    "enabled": True,
+    "automatic_approval": True,
+    "notify_creation": True,
+    "item_processor": ("oseoserver.orderpreparation.exampleorderprocessor."
+                       "ExampleOrderProcessor"),
+    "item_availability_days": 10,
+}
+
+# shared cache of prepared products, for use by the item processors. See
+# config.productcache
+OSEOSERVER_PRODUCT_CACHE = {
+    "directory": os.path.join(BASE_DIR, "product_cache"),
+    "max_bytes": 10 * 1024 ** 3,
+}
+
+OSEOSERVER_PROCESSING_OPTIONS = []
+
+OSEOSERVER_ONLINE_DATA_ACCESS_OPTIONS = [
+    {
+        "protocol":"http",
+        "fee": 0,
+    },
+]
+
+OSEOSERVER_COLLECTIONS = [
+    {
+        "name": "dummy_collection",
+        "catalogue_endpoint": "http://localhost",
+        "collection_identifier": "dummy_collection_id",
+        "product_price": 0,
+        "generation_frequency": "Once per hour",
+        "product_order": {
+            "enabled": True,
+            "order_processing_fee": 0,
+            "options": ["dummy option",],
+            "online_data_access_options": ["http",],
+            "online_data_delivery_options": [],
+            "media_delivery_options": [],
+            "payment_options": [],
+            "scene_selection_options": [],
+        },
+    },
+]
@@ -0,0 +1,75 @@
+"""Production settings for pyoseo.
+
+The database is PostgreSQL and it is configured with the following
+environment variables:
+
+* ``PYOSEO_DB_NAME`` - defaults to *pyoseo*
+* ``PYOSEO_DB_USER`` - defaults to *pyoseo*
+* ``PYOSEO_DB_PASSWORD`` - mandatory
+* ``PYOSEO_DB_HOST`` - defaults to *localhost*
+* ``PYOSEO_DB_PORT`` - defaults to *5432*
+* ``PYOSEO_DB_CONN_MAX_AGE`` - seconds to keep each connection open, defaults
+  to *600*
+* ``PYOSEO_DB_STATEMENT_TIMEOUT`` - milliseconds, defaults to *30000*
+
+Django keeps one persistent connection per thread. The threaded gunicorn
+workers of ``config/gunicorn.py`` therefore need ``PYOSEO_WEB_WORKERS`` times
+``PYOSEO_WEB_THREADS`` connections, and the database must accept those plus
+the celery worker processes (``CELERYD_CONCURRENCY``) plus the celerybeat
+process. When that is more than PostgreSQL's ``max_connections`` allows,
+point ``PYOSEO_DB_HOST`` to a pgbouncer pool with that size.
+
+Ordered files are handed over to the front web server for delivery, after
+django has authorized the download:
+
+* ``PYOSEO_SENDFILE_BACKEND`` - *nginx* (the default) uses
+  X-Accel-Redirect, *xsendfile* uses Apache's X-Sendfile and *simple* streams
+  files through django
+* ``PYOSEO_SENDFILE_ROOT`` - directory that holds the files to deliver,
+  defaults to */home/ftpuser*
+* ``PYOSEO_SENDFILE_URL`` - internal nginx location that serves
+  ``PYOSEO_SENDFILE_ROOT``, defaults to */protected*
+
+"""
+
+from __future__ import absolute_import
+
+from .base import *
+
+DEBUG = False
+
+SECRET_KEY = get_required_environment_variable("SECRET_KEY")
+
+ALLOWED_HOSTS = get_environment_variable(
+    "PYOSEO_ALLOWED_HOSTS", default="localhost").split(",")
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": get_environment_variable("PYOSEO_DB_NAME", default="pyoseo"),
+        "USER": get_environment_variable("PYOSEO_DB_USER", default="pyoseo"),
+        "PASSWORD": get_required_environment_variable("PYOSEO_DB_PASSWORD"),
+        "HOST": get_environment_variable("PYOSEO_DB_HOST",
+                                         default="localhost"),
+        "PORT": get_environment_variable("PYOSEO_DB_PORT", default="5432"),
+        "CONN_MAX_AGE": int(get_environment_variable(
+            "PYOSEO_DB_CONN_MAX_AGE", default="600")),
+        "OPTIONS": {
+            "connect_timeout": 10,
+            "options": "-c statement_timeout={0}".format(
+                get_environment_variable("PYOSEO_DB_STATEMENT_TIMEOUT",
+                                         default="30000")
+            ),
+        },
+    }
+}
+
+CELERYD_CONCURRENCY = int(get_environment_variable("CELERYD_CONCURRENCY",
+                                                   default="4"))
+
+SENDFILE_BACKEND = "sendfile.backends.{0}".format(
+    get_environment_variable("PYOSEO_SENDFILE_BACKEND", default="nginx"))
+SENDFILE_ROOT = get_environment_variable("PYOSEO_SENDFILE_ROOT",
+                                         default="/home/ftpuser")
+SENDFILE_URL = get_environment_variable("PYOSEO_SENDFILE_URL",
+                                        default="/protected")
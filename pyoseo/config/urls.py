@@ -16,8 +16,11 @@ Including another URLconf
 from django.conf.urls import url, include
 from django.contrib import admin
 
+from config.metrics import export_metrics
+
 urlpatterns = [
     url(r'^grappelli/', include("grappelli.urls")),
     url(r'^admin/', admin.site.urls),
+    url(r'^metrics$', export_metrics, name="prometheus-django-metrics"),
     url(r'^', include("oseoserver.urls")),
 ]
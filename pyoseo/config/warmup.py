@@ -0,0 +1,57 @@
+"""Load the expensive parts of pyoseo before any request is served.
+
+Importing the pyxb OGC bindings builds large binding classes and their
+content models. Doing it upfront, while the process is being started,
+prevents the first requests that each process handles from being slow.
+
+"""
+
+import importlib
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BINDING_MODULES = [
+    "pyxb.bundles.opengis.oseo_1_0",
+    "pyxb.bundles.wssplat.soap11",
+    "pyxb.bundles.wssplat.soap12",
+    "pyxb.bundles.wssplat.wsse",
+]
+
+
+def configure_validation():
+    """Apply the PYXB_VALIDATION setting to pyxb.
+
+    The setting is a mapping with the ``parsing`` and ``generating`` keys. It
+    controls whether pyxb validates incoming requests against the schemas
+    when parsing them and outgoing responses when generating them.
+
+    """
+
+    import pyxb
+    validation = getattr(settings, "PYXB_VALIDATION", {})
+    pyxb.RequireValidWhenParsing(validation.get("parsing", True))
+    pyxb.RequireValidWhenGenerating(validation.get("generating", True))
+
+
+def warm_up(render_capabilities=False):
+    """Import the OGC bindings and configure their validation.
+
+    :arg render_capabilities: Whether to also render the GetCapabilities
+        responses, which only web server processes serve
+    :type render_capabilities: bool
+
+    """
+
+    start = time.time()
+    for module_path in BINDING_MODULES:
+        importlib.import_module(module_path)
+    configure_validation()
+    logger.info("Loaded the pyxb OGC bindings in {0:.2f}s".format(
+        time.time() - start))
+    if render_capabilities:
+        from . import capabilities
+        capabilities.render_responses()
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from config.metrics import register_collectors
+from config.warmup import warm_up
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pyoseo.settings")
 
 application = get_wsgi_application()
+warm_up(render_capabilities=True)
+register_collectors()
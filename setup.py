@@ -35,7 +35,10 @@ setuptools.setup(
         "django",
         "django-grappelli",
         "django-mail-queue",
+        "django-prometheus",
+        "django-redis",
         "django-sendfile",
+        "lxml",
         "pathlib2",
     ],
     zip_safe=False,
@@ -0,0 +1,157 @@
+"""pytest configuration for the benchmark suite."""
+
+import gzip
+import io
+import json
+import os
+
+import pytest
+import requests
+
+import loadrunner
+import oseorequests
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    results = {}
+    yield results
+    output_path = request.config.getoption("--benchmark-save-baseline")
+    if output_path is not None and results:
+        existing = {}
+        if os.path.isfile(output_path):
+            with open(output_path) as fh:
+                existing = json.load(fh)
+        existing.update(results)
+        with open(output_path, "w") as fh:
+            json.dump(existing, fh, indent=4, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def benchmark_baseline(request):
+    baseline_path = request.config.getoption("--benchmark-baseline")
+    baseline = {}
+    if baseline_path is not None:
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+    return baseline
+
+
+@pytest.fixture
+def load_test_server_url(pyoseo_remote_server):
+    """Return the URL of the server to load test.
+
+    Load tests need a real deployment. The local testing server that is
+    spawned by pytest-django handles a single request at a time, so any
+    concurrency would only measure queueing.
+
+    """
+
+    if pyoseo_remote_server is None:
+        pytest.skip("load tests require --pyoseo-server-url")
+    return pyoseo_remote_server
+
+
+@pytest.fixture
+def benchmark_config(request):
+    return {
+        "concurrency": request.config.getoption("--benchmark-concurrency"),
+        "requests": request.config.getoption("--benchmark-requests"),
+    }
+
+
+@pytest.fixture
+def check_benchmark(request, benchmark_results, benchmark_baseline):
+    """Report a benchmark result and fail if it regressed.
+
+    Results are printed and stored so that they can be saved as a new
+    baseline at the end of the session.
+
+    """
+
+    tolerance = request.config.getoption("--benchmark-tolerance")
+
+    def _check(name, result):
+        print("{0}: {1}".format(name, result))
+        assert result.errors == 0
+        benchmark_results[name] = result._asdict()
+        baseline = benchmark_baseline.get(name)
+        if baseline is not None:
+            regressions = loadrunner.compare_with_baseline(
+                result, baseline, tolerance)
+            assert not regressions, "{0} regressed: {1}".format(
+                name, "; ".join(regressions))
+    return _check
+
+
+@pytest.fixture
+def collection_id(settings):
+    return settings.OSEOSERVER_COLLECTIONS[0]["collection_identifier"]
+
+
+@pytest.fixture
+def submit_orders(load_test_server_url, pyoseo_server_user,
+                  pyoseo_server_password, collection_id):
+    """Place orders on the server under test and return their ids."""
+
+    def _submit(num_orders, num_items=1):
+        request_data = oseorequests.build_soap12_request(
+            oseorequests.build_submit(collection_id, num_items=num_items),
+            pyoseo_server_user,
+            pyoseo_server_password
+        )
+        order_ids = []
+        for _ in range(num_orders):
+            response = requests.post(load_test_server_url, data=request_data)
+            submit_ack = oseorequests.parse_soap12_response(response.text)
+            order_ids.append(submit_ack.orderId)
+        return order_ids
+    return _submit
+
+
+@pytest.fixture
+def run_oseo_load(load_test_server_url, pyoseo_server_user,
+                  pyoseo_server_password, benchmark_config, check_benchmark):
+    """Load test the server with OSEO requests and check the result.
+
+    The returned function takes the benchmark's name and an OSEO request,
+    or a list of them. The requests are wrapped in SOAP envelopes and sent
+    in turn until ``num_requests`` have been made, which defaults to the
+    ``--benchmark-requests`` option. Payloads are gzip compressed when
+    ``content_encoding`` is "gzip".
+
+    """
+
+    def _run(name, oseo_request, num_requests=None, headers=None,
+             content_encoding=None):
+        if not isinstance(oseo_request, (list, tuple)):
+            oseo_request = [oseo_request]
+        request_data = [
+            oseorequests.build_soap12_request(
+                item, pyoseo_server_user, pyoseo_server_password)
+            for item in oseo_request
+        ]
+        headers = dict(headers or {})
+        if content_encoding == "gzip":
+            request_data = [gzip_compress(data) for data in request_data]
+            headers["Content-Encoding"] = "gzip"
+        if num_requests is None:
+            num_requests = benchmark_config["requests"]
+        payloads = [request_data[index % len(request_data)]
+                    for index in range(num_requests)]
+        result = loadrunner.run_load_test(
+            load_test_server_url,
+            payloads,
+            benchmark_config["concurrency"],
+            headers=headers or None
+        )
+        check_benchmark(name, result)
+        return result
+    return _run
+
+
+def gzip_compress(data):
+    buffer_ = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer_, mode="wb") as fh:
+        fh.write(data)
+    return buffer_.getvalue()
@@ -0,0 +1,149 @@
+"""Utilities for load testing an OSEO server."""
+
+from __future__ import division
+import collections
+import math
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+import requests
+
+LoadTestResult = collections.namedtuple(
+    "LoadTestResult",
+    [
+        "num_requests",
+        "errors",
+        "elapsed",
+        "requests_per_second",
+        "p50",
+        "p95",
+        "p99",
+        "mean_response_bytes",
+    ]
+)
+
+_thread_data = threading.local()
+
+
+def run_load_test(url, payloads, concurrency, headers=None):
+    """POST each of the input payloads to the url and measure performance.
+
+    :arg url: The OSEO endpoint
+    :type url: str
+    :arg payloads: An iterable with the serialized requests to send. Each
+        payload is sent exactly once
+    :arg concurrency: Number of concurrent clients
+    :type concurrency: int
+    :arg headers: Additional HTTP headers to send with each request
+    :type headers: dict
+    :return: The measured latencies, throughput and response sizes
+    :rtype: LoadTestResult
+
+    """
+
+    pool = ThreadPool(processes=concurrency)
+    start = time.time()
+    try:
+        measurements = pool.map(
+            lambda payload: _timed_post(url, payload, headers),
+            list(payloads)
+        )
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.time() - start
+    latencies = sorted(m[0] for m in measurements)
+    errors = len([m for m in measurements if not m[1]])
+    return LoadTestResult(
+        num_requests=len(measurements),
+        errors=errors,
+        elapsed=elapsed,
+        requests_per_second=len(measurements) / elapsed,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        mean_response_bytes=sum(m[2] for m in measurements) / len(
+            measurements),
+    )
+
+
+def measure_streamed_response(url, payload, headers=None,
+                              chunk_size=8192):
+    """POST the payload and measure how the response is streamed back.
+
+    :return: A three-element tuple with the time to first byte, the total
+        time and the size of the response, in bytes
+    :rtype: (float, float, int)
+
+    """
+
+    start = time.time()
+    response = requests.post(url, data=payload, headers=headers,
+                             stream=True)
+    response.raise_for_status()
+    time_to_first_byte = None
+    size = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if time_to_first_byte is None:
+            time_to_first_byte = time.time() - start
+        size += len(chunk)
+    return time_to_first_byte, time.time() - start, size
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(sorted_values)))
+    index = min(max(rank, 1), len(sorted_values)) - 1
+    return sorted_values[index]
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """Compare a result with its baseline and return the regressions found.
+
+    :arg result: The current result
+    :type result: LoadTestResult
+    :arg baseline: A mapping with the baseline values, as saved by a
+        previous benchmark run
+    :type baseline: dict
+    :arg tolerance: Maximum allowed relative regression
+    :type tolerance: float
+    :return: A list of human readable regression descriptions
+    :rtype: list
+
+    """
+
+    regressions = []
+    min_rps = baseline["requests_per_second"] * (1 - tolerance)
+    if result.requests_per_second < min_rps:
+        regressions.append(
+            "requests_per_second {0:.2f} is below {1:.2f}".format(
+                result.requests_per_second, min_rps)
+        )
+    for latency in ("p50", "p95", "p99"):
+        max_latency = baseline[latency] * (1 + tolerance)
+        current = getattr(result, latency)
+        if current > max_latency:
+            regressions.append(
+                "{0} latency {1:.4f}s is above {2:.4f}s".format(
+                    latency, current, max_latency)
+            )
+    return regressions
+
+
+def _timed_post(url, payload, headers):
+    session = getattr(_thread_data, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_data.session = session
+    start = time.time()
+    try:
+        response = session.post(url, data=payload, headers=headers)
+    except requests.RequestException:
+        return time.time() - start, False, 0
+    latency = time.time() - start
+    transferred = int(response.headers.get("Content-Length",
+                                           len(response.content)))
+    return latency, response.ok, transferred
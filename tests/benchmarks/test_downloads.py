@@ -0,0 +1,41 @@
+"""Benchmarks for the delivery of ordered files."""
+
+import time
+
+import pytest
+import requests
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture
+def download_url(request):
+    url = request.config.getoption("--benchmark-download-url")
+    if url is None:
+        pytest.skip("--benchmark-download-url was not specified")
+    return url
+
+
+@pytest.fixture
+def download_auth(pyoseo_server_user, pyoseo_server_password):
+    return pyoseo_server_user, pyoseo_server_password
+
+
+def test_download_throughput(download_url, download_auth):
+    start = time.time()
+    response = requests.get(download_url, auth=download_auth, stream=True)
+    response.raise_for_status()
+    size = 0
+    for chunk in response.iter_content(chunk_size=1024 * 1024):
+        size += len(chunk)
+    elapsed = time.time() - start
+    print("Downloaded {0} bytes in {1:.2f}s ({2:.2f} MB/s)".format(
+        size, elapsed, size / elapsed / 1024 ** 2))
+    assert size > 0
+
+
+def test_download_range(download_url, download_auth):
+    response = requests.get(download_url, auth=download_auth,
+                            headers={"Range": "bytes=0-1023"})
+    assert response.status_code == 206
+    assert len(response.content) == 1024
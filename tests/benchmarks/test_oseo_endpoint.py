@@ -0,0 +1,131 @@
+"""Load tests for the OSEO operations.
+
+Run them with::
+
+    py.test -m benchmark --benchmark-concurrency=8 --benchmark-requests=500
+
+"""
+
+import datetime
+
+import pytest
+import requests
+
+import loadrunner
+import oseorequests
+
+pytestmark = pytest.mark.benchmark
+
+
+class TestOseoEndpointLoad(object):
+
+    def test_get_capabilities(self, run_oseo_load):
+        run_oseo_load("GetCapabilities",
+                      oseorequests.build_get_capabilities())
+
+    def test_submit(self, run_oseo_load, collection_id):
+        run_oseo_load("Submit", oseorequests.build_submit(collection_id))
+
+    def test_get_status(self, run_oseo_load, submit_orders):
+        order_id = submit_orders(1)[0]
+        run_oseo_load("GetStatus", oseorequests.build_get_status(order_id))
+
+    def test_describe_result_access(self, run_oseo_load, submit_orders):
+        order_id = submit_orders(1)[0]
+        run_oseo_load("DescribeResultAccess",
+                      oseorequests.build_describe_result_access(order_id))
+
+    def test_cancel(self, run_oseo_load, submit_orders, benchmark_config):
+        order_ids = submit_orders(benchmark_config["requests"])
+        run_oseo_load("Cancel", [oseorequests.build_cancel(order_id)
+                                 for order_id in order_ids])
+
+    def test_concurrent_submit_and_get_status(self, request, run_oseo_load,
+                                              submit_orders, collection_id):
+        """Mix writes and reads in order to stress the database backend.
+
+        Run this benchmark against servers that use the local (SQLite) and
+        the production (PostgreSQL) settings in order to compare them. The
+        ``--benchmark-database`` option labels the results, because the
+        settings of the pytest process say nothing about the server.
+
+        """
+
+        order_id = submit_orders(1)[0]
+        name = "Submit+GetStatus"
+        database = request.config.getoption("--benchmark-database")
+        if database is not None:
+            name = "{0} ({1})".format(name, database)
+        run_oseo_load(
+            name,
+            [oseorequests.build_submit(collection_id),
+             oseorequests.build_get_status(order_id)]
+        )
+
+    @pytest.mark.parametrize("num_items", [10, 1000, 10000])
+    def test_get_status_full_large_order(self, num_items, pyoseo_server_url,
+                                         pyoseo_server_user,
+                                         pyoseo_server_password,
+                                         collection_id):
+        submit_data = oseorequests.build_soap12_request(
+            oseorequests.build_submit(collection_id, num_items=num_items),
+            pyoseo_server_user,
+            pyoseo_server_password
+        )
+        response = requests.post(pyoseo_server_url, data=submit_data)
+        order_id = oseorequests.parse_soap12_response(response.text).orderId
+        request_data = oseorequests.build_soap12_request(
+            oseorequests.build_get_status(order_id, presentation="full"),
+            pyoseo_server_user,
+            pyoseo_server_password
+        )
+        ttfb, total, size = loadrunner.measure_streamed_response(
+            pyoseo_server_url, request_data)
+        print("GetStatus full ({0} items): time to first byte: {1:.4f}s, "
+              "total: {2:.4f}s, size: {3} bytes".format(
+                  num_items, ttfb, total, size))
+        assert size > 0
+
+    @pytest.mark.parametrize("num_items", [1, 100, 5000])
+    def test_submit_order_size(self, num_items, run_oseo_load,
+                               benchmark_config, collection_id):
+        result = run_oseo_load(
+            "Submit ({0} items)".format(num_items),
+            oseorequests.build_submit(collection_id, num_items=num_items),
+            num_requests=max(benchmark_config["requests"] // num_items, 1)
+        )
+        print("Submit ({0} items): {1:.6f}s per item".format(
+            num_items, result.p50 / num_items))
+
+    @pytest.mark.parametrize("encoding", ["identity", "gzip"])
+    def test_get_status_full_compression(self, encoding, run_oseo_load,
+                                         submit_orders):
+        order_id = submit_orders(1, num_items=100)[0]
+        run_oseo_load(
+            "GetStatus full ({0})".format(encoding),
+            oseorequests.build_get_status(order_id, presentation="full"),
+            headers={"Accept-Encoding": encoding}
+        )
+
+    @pytest.mark.parametrize("encoding", ["identity", "gzip"])
+    def test_submit_compressed_request(self, encoding, run_oseo_load,
+                                       benchmark_config, collection_id):
+        run_oseo_load(
+            "Submit 1000 items ({0})".format(encoding),
+            oseorequests.build_submit(collection_id, num_items=1000),
+            num_requests=max(benchmark_config["requests"] // 100, 1),
+            content_encoding=encoding
+        )
+
+    def test_get_status_search_as_orders_grow(self, run_oseo_load,
+                                              submit_orders):
+        """Search latency should not depend on the number of stored orders"""
+        last_update = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        request = oseorequests.build_get_status_search(
+            last_update=last_update, order_status="Submitted")
+        stored_orders = 0
+        for total_orders in (10, 100, 1000):
+            submit_orders(total_orders - stored_orders)
+            stored_orders = total_orders
+            run_oseo_load(
+                "GetStatus search ({0} orders)".format(total_orders), request)
@@ -0,0 +1,56 @@
+"""Micro-benchmarks comparing pyxb and lxml parsing of OSEO requests."""
+
+import timeit
+
+from lxml import etree
+from pyxb.bundles.wssplat import soap12
+import pytest
+
+import oseorequests
+
+pytestmark = pytest.mark.benchmark
+
+OSEO_NAMESPACE = "http://www.opengis.net/oseo/1.0"
+
+REQUEST_BUILDERS = {
+    "GetCapabilities": oseorequests.build_get_capabilities,
+    "GetStatus": lambda: oseorequests.build_get_status("1"),
+    "DescribeResultAccess": (
+        lambda: oseorequests.build_describe_result_access("1")),
+    "Cancel": lambda: oseorequests.build_cancel("1"),
+}
+
+
+def parse_with_pyxb(request_data):
+    soap_request_env = soap12.CreateFromDocument(request_data)
+    oseo_request = soap_request_env.Body.wildcardElements()[0]
+    return oseo_request._element().name().localName()
+
+
+def parse_with_lxml(request_data):
+    envelope = etree.fromstring(request_data)
+    oseo_request = envelope.xpath(
+        "/*[local-name()='Envelope']/*[local-name()='Body']/oseo:*",
+        namespaces={"oseo": OSEO_NAMESPACE}
+    )[0]
+    order_id = oseo_request.findtext("{{{0}}}orderId".format(OSEO_NAMESPACE))
+    return etree.QName(oseo_request).localname, order_id
+
+
+@pytest.mark.parametrize("operation", sorted(REQUEST_BUILDERS.keys()))
+def test_parsing_speed(operation, pyoseo_server_user, pyoseo_server_password,
+                       benchmark_config):
+    request_data = oseorequests.build_soap12_request(
+        REQUEST_BUILDERS[operation](),
+        pyoseo_server_user,
+        pyoseo_server_password
+    )
+    assert parse_with_pyxb(request_data) == operation
+    assert parse_with_lxml(request_data)[0] == operation
+    number = benchmark_config["requests"]
+    pyxb_time = timeit.timeit(lambda: parse_with_pyxb(request_data),
+                              number=number) / number
+    lxml_time = timeit.timeit(lambda: parse_with_lxml(request_data),
+                              number=number) / number
+    print("{0}: pyxb {1:.6f}s, lxml {2:.6f}s ({3:.1f}x faster)".format(
+        operation, pyxb_time, lxml_time, pyxb_time / lxml_time))
@@ -13,6 +13,10 @@ def pytest_configure(config):
         "markers",
         "functional: run only functional tests"
     )
+    config.addinivalue_line(
+        "markers",
+        "benchmark: run only the load tests and benchmarks"
+    )
 
 
 def pytest_addoption(parser):
@@ -34,6 +38,49 @@ def pytest_addoption(parser):
         help="Password to use in pyoseo functional tests. Defaults to "
              "%(default)s"
     )
+    parser.addoption(
+        "--benchmark-concurrency",
+        type=int,
+        default=4,
+        help="Number of concurrent clients to use in benchmarks. Defaults "
+             "to %(default)s"
+    )
+    parser.addoption(
+        "--benchmark-requests",
+        type=int,
+        default=100,
+        help="Number of requests to perform for each benchmarked OSEO "
+             "operation. Defaults to %(default)s"
+    )
+    parser.addoption(
+        "--benchmark-baseline",
+        help="Path to a JSON file with baseline benchmark results. When "
+             "specified, benchmarks fail if they regress beyond the "
+             "tolerance when compared with the baseline"
+    )
+    parser.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.2,
+        help="Maximum allowed relative regression when comparing with the "
+             "baseline. Defaults to %(default)s"
+    )
+    parser.addoption(
+        "--benchmark-database",
+        help="Database backend of the server under test, like sqlite3 or "
+             "postgresql. It is added to the names of the benchmarks that "
+             "compare database backends"
+    )
+    parser.addoption(
+        "--benchmark-download-url",
+        help="URL of an ordered file to use when benchmarking downloads. "
+             "Download benchmarks are skipped if it is not specified"
+    )
+    parser.addoption(
+        "--benchmark-save-baseline",
+        help="Path to a JSON file where benchmark results are to be saved, "
+             "in order to be used as a baseline for future runs"
+    )
 
 
 @pytest.fixture
@@ -54,3 +101,14 @@ def pyoseo_remote_server(request):
 @pytest.fixture
 def pyoseo_local_server(request, settings, live_server, transactional_db):
     settings.DEBUG = True
+    return "".join((live_server.url, reverse("oseo_endpoint")))
+
+
+@pytest.fixture
+def pyoseo_server_url(request, pyoseo_remote_server):
+    """Return the remote server's URL or spawn a local testing server"""
+    if pyoseo_remote_server is not None:
+        result = pyoseo_remote_server
+    else:
+        result = request.getfixturevalue("pyoseo_local_server")
+    return result
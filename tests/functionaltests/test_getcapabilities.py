@@ -1,10 +1,8 @@
 import pytest
-from pyxb import BIND
-from pyxb.bundles.opengis import oseo_1_0 as oseo
-from pyxb.bundles.wssplat import soap12
-from pyxb.bundles.wssplat import wsse
 import requests
 
+import oseorequests
+
 pytestmark = pytest.mark.functional
 
 
@@ -18,22 +16,13 @@ class TestGetCapabilities(object):
     def test_default_get_capabilities(self, pyoseo_remote_server,
                                       pyoseo_server_user,
                                       pyoseo_server_password):
-        get_caps = oseo.GetCapabilities(service="OS")
-        security = wsse.Security(
-            wsse.UsernameToken(
-                pyoseo_server_user,
-                wsse.Password(pyoseo_server_password, Type="BBBB#VITO")
-            ))
-        soap_request_env = soap12.Envelope(
-            Header=BIND(security),
-            Body=BIND(get_caps)
-        )
-        request_data = soap_request_env.toxml(encoding="utf-8")
+        get_caps = oseorequests.build_get_capabilities()
+        request_data = oseorequests.build_soap12_request(
+            get_caps, pyoseo_server_user, pyoseo_server_password)
         response = requests.post(pyoseo_remote_server, data=request_data)
         response_data = response.text
         print("response_data: {}".format(response_data))
-        soap_response_env = soap12.CreateFromDocument(response_data)
-        caps = soap_response_env.Body.wildcardElements()[0]
+        caps = oseorequests.parse_soap12_response(response_data)
         print("caps type: {}".format(type(caps)))
         assert caps._element().name().localName() == "Capabilities"
 
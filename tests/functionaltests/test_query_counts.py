@@ -0,0 +1,89 @@
+"""Check that the number of database queries does not grow with orders.
+
+These tests run the OSEO endpoint in-process, so that the queries it performs
+can be captured. The GetStatus and DescribeResultAccess views live in the
+oseoserver app, which still performs queries per order item, so the tests are
+expected to fail until it is fixed there. The response cache is replaced by
+an in-memory one, so that no redis server is needed.
+
+"""
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+import oseorequests
+
+pytestmark = [
+    pytest.mark.functional,
+    pytest.mark.django_db,
+    pytest.mark.xfail(
+        strict=True,
+        raises=AssertionError,
+        reason="oseoserver queries each order item separately when "
+               "building GetStatus and DescribeResultAccess responses"
+    ),
+]
+
+SOAP12_CONTENT_TYPE = "application/soap+xml"
+
+
+@pytest.fixture
+def oseo_client(client, settings, pyoseo_server_user,
+                pyoseo_server_password):
+    settings.CELERY_ALWAYS_EAGER = True
+    settings.CACHES = dict(settings.CACHES, responses={
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-responses",
+    })
+    url = reverse("oseo_endpoint")
+
+    def _post(oseo_request):
+        request_data = oseorequests.build_soap12_request(
+            oseo_request, pyoseo_server_user, pyoseo_server_password)
+        response = client.post(url, data=request_data,
+                               content_type=SOAP12_CONTENT_TYPE)
+        # not an assertion, so that it is not taken for the expected failure
+        if response.status_code != 200:
+            pytest.fail("The OSEO endpoint answered with status {0}".format(
+                response.status_code))
+        return response
+    return _post
+
+
+def count_queries(oseo_client, oseo_request):
+    with CaptureQueriesContext(connection) as context:
+        oseo_client(oseo_request)
+    return len(context.captured_queries)
+
+
+def submit_order(oseo_client, collection_id, num_items):
+    response = oseo_client(
+        oseorequests.build_submit(collection_id, num_items=num_items))
+    return oseorequests.parse_soap12_response(response.content).orderId
+
+
+class TestQueryCounts(object):
+
+    def test_get_status_full(self, oseo_client, settings):
+        col_id = settings.OSEOSERVER_COLLECTIONS[0]["collection_identifier"]
+        query_counts = []
+        for num_items in (1, 1000):
+            order_id = submit_order(oseo_client, col_id, num_items)
+            query_counts.append(count_queries(
+                oseo_client,
+                oseorequests.build_get_status(order_id, presentation="full")
+            ))
+        assert query_counts[0] == query_counts[1]
+
+    def test_describe_result_access(self, oseo_client, settings):
+        col_id = settings.OSEOSERVER_COLLECTIONS[0]["collection_identifier"]
+        query_counts = []
+        for num_items in (1, 1000):
+            order_id = submit_order(oseo_client, col_id, num_items)
+            query_counts.append(count_queries(
+                oseo_client,
+                oseorequests.build_describe_result_access(order_id)
+            ))
+        assert query_counts[0] == query_counts[1]
@@ -0,0 +1,104 @@
+"""Builders for the OSEO requests that are used throughout the test suites."""
+
+from pyxb import BIND
+from pyxb.bundles.opengis import oseo_1_0 as oseo
+from pyxb.bundles.wssplat import soap12
+from pyxb.bundles.wssplat import wsse
+
+
+def build_get_capabilities():
+    return oseo.GetCapabilities(service="OS")
+
+
+def build_submit(collection_id, num_items=1, reference="dummy reference"):
+    order_items = []
+    for index in range(1, num_items + 1):
+        order_items.append(
+            oseo.CommonOrderItemType(
+                itemId="dummy item id{}".format(index),
+                productOrderOptionsId="dummy productorderoptionsid{}".format(
+                    index),
+                orderItemRemark="dumm item remark{}".format(index),
+                productId=oseo.ProductIdType(
+                    identifier="dummy catalog identifier{}".format(index),
+                    collectionId=collection_id
+                )
+            )
+        )
+    return oseo.Submit(
+        service="OS",
+        version="1.0.0",
+        orderSpecification=oseo.OrderSpecification(
+            orderReference=reference,
+            orderRemark="dummy remark",
+            deliveryOptions=oseo.deliveryOptions(
+                onlineDataAccess=BIND(
+                    protocol="http"
+                )
+            ),
+            orderType="PRODUCT_ORDER",
+            orderItem=order_items,
+        ),
+        statusNotification="None"
+    )
+
+
+def build_get_status(order_id, presentation="brief"):
+    return oseo.GetStatus(
+        service="OS",
+        version="1.0.0",
+        orderId=order_id,
+        presentation=presentation
+    )
+
+
+def build_get_status_search(last_update=None, last_update_end=None,
+                            order_status=None, presentation="brief"):
+    return oseo.GetStatus(
+        service="OS",
+        version="1.0.0",
+        filteringCriteria=BIND(
+            lastUpdate=last_update,
+            lastUpdateEnd=last_update_end,
+            orderStatus=order_status
+        ),
+        presentation=presentation
+    )
+
+
+def build_describe_result_access(order_id, sub_function="allReady"):
+    return oseo.DescribeResultAccess(
+        service="OS",
+        version="1.0.0",
+        orderId=order_id,
+        subFunction=sub_function
+    )
+
+
+def build_cancel(order_id):
+    return oseo.Cancel(
+        service="OS",
+        version="1.0.0",
+        orderId=order_id,
+        statusNotification="None"
+    )
+
+
+def build_soap12_request(oseo_request, user, password):
+    """Wrap an OSEO request in a SOAP 1.2 envelope and serialize it."""
+    security = wsse.Security(
+        wsse.UsernameToken(
+            user,
+            wsse.Password(password, Type="BBBB#VITO")
+        ))
+    soap_request_env = soap12.Envelope(
+        Header=BIND(security),
+        Body=BIND(oseo_request)
+    )
+    return soap_request_env.toxml(encoding="utf-8")
+
+
+def parse_soap12_response(response_data):
+    """Return the OSEO element that is inside a SOAP 1.2 response."""
+    soap_response_env = soap12.CreateFromDocument(response_data)
+    return soap_response_env.Body.wildcardElements()[0]
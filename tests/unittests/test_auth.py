@@ -0,0 +1,152 @@
+"""Unit tests for the caching authentication wrapper"""
+
+from lxml import etree
+import pytest
+
+from config import auth
+
+pytestmark = pytest.mark.unit
+
+REQUEST_TEMPLATE = """
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+    xmlns:wsse="{wsse}">
+  <soap:Header>
+    <wsse:Security>
+      <wsse:UsernameToken>
+        <wsse:Username>{user}</wsse:Username>
+        <wsse:Password>{password}</wsse:Password>
+      </wsse:UsernameToken>
+    </wsse:Security>
+  </soap:Header>
+  <soap:Body/>
+</soap:Envelope>
+"""
+
+
+def build_request(user, password):
+    return etree.fromstring(REQUEST_TEMPLATE.format(
+        wsse=auth.WSSE_NAMESPACE, user=user, password=password))
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingAuthentication(object):
+
+    calls = 0
+
+    def authenticate_request(self, request_element, soap_version):
+        CountingAuthentication.calls += 1
+        user = request_element.xpath(
+            "//wsse:Username/text()",
+            namespaces={"wsse": auth.WSSE_NAMESPACE}
+        )[0]
+        if user == "bad":
+            raise ValueError("Invalid user")
+        elif user == "unreachable":
+            raise IOError("Identity service timed out")
+        return user, "pass"
+
+
+class TestAuthenticationCache(object):
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = auth.AuthenticationCache(ttl=10, negative_ttl=1,
+                                         max_size=5, clock=clock)
+        cache.set_result("key", ("user", "pass"))
+        clock.now = 9
+        assert cache.get("key").result == ("user", "pass")
+        clock.now = 10
+        assert cache.get("key") is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_errors_use_negative_ttl(self):
+        clock = FakeClock()
+        cache = auth.AuthenticationCache(ttl=10, negative_ttl=1,
+                                         max_size=5, clock=clock)
+        cache.set_error("key", ValueError("Invalid user"))
+        error = cache.get("key").error
+        assert isinstance(error, ValueError)
+        assert error.args == ("Invalid user",)
+        clock.now = 1
+        assert cache.get("key") is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = auth.AuthenticationCache(ttl=10, negative_ttl=1, max_size=2)
+        cache.set_result("first", 1)
+        cache.set_result("second", 2)
+        cache.get("first")
+        cache.set_result("third", 3)
+        assert len(cache) == 2
+        assert cache.get("second") is None
+        assert cache.get("first").result == 1
+
+
+class TestGetTokenKey(object):
+
+    def test_same_token_same_key(self):
+        first = auth.get_token_key(build_request("user", "pass"), "1.2")
+        second = auth.get_token_key(build_request("user", "pass"), "1.2")
+        assert first == second
+
+    def test_different_token_different_key(self):
+        first = auth.get_token_key(build_request("user", "pass"), "1.2")
+        second = auth.get_token_key(build_request("user", "other"), "1.2")
+        assert first != second
+
+    def test_no_token(self):
+        request_element = etree.fromstring("<request/>")
+        assert auth.get_token_key(request_element, "1.2") is None
+
+
+class TestCachingAuthentication(object):
+
+    @pytest.fixture(autouse=True)
+    def authenticator(self, monkeypatch):
+        CountingAuthentication.calls = 0
+        monkeypatch.setattr(auth, "_authenticator", CountingAuthentication())
+        monkeypatch.setattr(auth, "_negative_cache_errors", (ValueError,))
+        monkeypatch.setattr(auth, "_cache", auth.AuthenticationCache(
+            ttl=10, negative_ttl=10, max_size=10))
+
+    def test_successful_authentication_is_cached(self):
+        request_element = build_request("user", "pass")
+        for _ in range(3):
+            result = auth.CachingAuthentication().authenticate_request(
+                request_element, "1.2")
+            assert result == ("user", "pass")
+        assert CountingAuthentication.calls == 1
+
+    def test_failed_authentication_is_cached(self):
+        request_element = build_request("bad", "pass")
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                auth.CachingAuthentication().authenticate_request(
+                    request_element, "1.2")
+        assert CountingAuthentication.calls == 1
+
+    def test_cached_failure_is_raised_as_a_new_error(self):
+        request_element = build_request("bad", "pass")
+        errors = []
+        for _ in range(3):
+            with pytest.raises(ValueError) as exc_info:
+                auth.CachingAuthentication().authenticate_request(
+                    request_element, "1.2")
+            errors.append(exc_info.value)
+        assert errors[1] is not errors[2]
+
+    def test_other_errors_are_not_cached(self):
+        request_element = build_request("unreachable", "pass")
+        for _ in range(3):
+            with pytest.raises(IOError):
+                auth.CachingAuthentication().authenticate_request(
+                    request_element, "1.2")
+        assert CountingAuthentication.calls == 3
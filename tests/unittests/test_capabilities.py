@@ -0,0 +1,74 @@
+"""Unit tests for the pre-rendered GetCapabilities responses"""
+
+from django.core.cache import caches
+from django.http import HttpResponse
+import pytest
+
+from config import capabilities
+from config import middleware
+
+pytestmark = pytest.mark.unit
+
+CAPABILITIES = b"<Capabilities/>"
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    caches[capabilities.CACHE_ALIAS].clear()
+    monkeypatch.setattr(
+        capabilities, "_render",
+        lambda namespace, soap_version: HttpResponse(
+            CAPABILITIES, content_type="application/soap+xml")
+    )
+    capabilities.render_responses()
+    yield
+    caches[capabilities.CACHE_ALIAS].clear()
+
+
+def build_request(rf, operation="GetCapabilities", **extra):
+    request = rf.post("/oseo/", data=b"", content_type="application/soap+xml",
+                      **extra)
+    request.oseo_metrics = (operation, "1.2", 0)
+    return request
+
+
+class TestGetCapabilitiesCacheMiddleware(object):
+
+    def test_serves_rendered_response(self, rendered, rf):
+        response = middleware.GetCapabilitiesCacheMiddleware().process_request(
+            build_request(rf))
+        assert response.status_code == 200
+        assert response.content == CAPABILITIES
+        assert response["ETag"].startswith('"')
+
+    @pytest.mark.parametrize("suffix", ["", ";gzip"])
+    def test_matching_etag_is_not_modified(self, rendered, rf, suffix):
+        cache_middleware = middleware.GetCapabilitiesCacheMiddleware()
+        etag = cache_middleware.process_request(build_request(rf))["ETag"]
+        request = build_request(
+            rf, HTTP_IF_NONE_MATCH='"other", {0}{1}"'.format(etag[:-1],
+                                                             suffix))
+        response = cache_middleware.process_request(request)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+    def test_other_operations_are_not_served(self, rendered, rf):
+        response = middleware.GetCapabilitiesCacheMiddleware().process_request(
+            build_request(rf, operation="GetStatus"))
+        assert response is None
+
+    def test_changed_settings_are_not_served(self, rendered, rf, settings):
+        settings.OSEOSERVER_PROCESSING_OPTIONS = [{"name": "new"}]
+        response = middleware.GetCapabilitiesCacheMiddleware().process_request(
+            build_request(rf))
+        assert response is None
+
+    def test_failed_rendering_is_not_cached(self, monkeypatch):
+        caches[capabilities.CACHE_ALIAS].clear()
+        monkeypatch.setattr(
+            capabilities, "_render",
+            lambda namespace, soap_version: HttpResponse(status=401)
+        )
+        capabilities.render_responses()
+        assert capabilities.get_cached_response("1.1") is None
+        assert capabilities.get_cached_response("1.2") is None
@@ -0,0 +1,129 @@
+"""Unit tests for pyoseo's metrics"""
+
+import collections
+
+import pytest
+
+from config import metrics
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize("namespace, soap_version", [
+    ("http://schemas.xmlsoap.org/soap/envelope/", "1.1"),
+    ("http://www.w3.org/2003/05/soap-envelope", "1.2"),
+])
+def test_get_soap_request_info(namespace, soap_version):
+    body = """
+    <soap:Envelope xmlns:soap="{0}"
+                   xmlns:oseo="http://www.opengis.net/oseo/1.0">
+      <soap:Header><Security/></soap:Header>
+      <soap:Body>
+        <oseo:GetStatus service="OS" version="1.0.0"/>
+      </soap:Body>
+    </soap:Envelope>
+    """.format(namespace).encode("utf-8")
+    assert metrics.get_soap_request_info(body) == ("GetStatus", soap_version)
+
+
+@pytest.mark.parametrize("body", [
+    b"""<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">
+      <soap:Body><Unknown xmlns="http://example.com"/></soap:Body>
+    </soap:Envelope>""",
+    b"""<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+                      xmlns:oseo="http://www.opengis.net/oseo/1.0">
+      <soap:Body><oseo:Made-up/></soap:Body>
+    </soap:Envelope>""",
+    b"""<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+                      xmlns:oseo="http://www.opengis.net/oseo/1.0">
+      <soap:Header><oseo:Body/><Cancel/></soap:Header>
+    </soap:Envelope>""",
+])
+def test_get_soap_request_info_other_operation(body):
+    assert metrics.get_soap_request_info(body) == ("other", "1.2")
+
+
+@pytest.mark.parametrize("body", [
+    b"<notsoap/>",
+    b"not xml",
+    b"",
+])
+def test_get_soap_request_info_not_soap(body):
+    assert metrics.get_soap_request_info(body) == (None, None)
+
+
+class BrokenCollector(metrics.OrderStatusCollector):
+
+    calls = 0
+
+    def _get_counts(self):
+        BrokenCollector.calls += 1
+        raise RuntimeError("database is down")
+
+
+def test_order_status_collector_errors_are_not_raised():
+    BrokenCollector.calls = 0
+    collector = BrokenCollector()
+    assert list(collector.collect()) == []
+    assert list(collector.collect()) == []
+    assert BrokenCollector.calls == 1  # failures are cached too
+
+
+def test_order_status_counts_are_cached(monkeypatch):
+    collector = metrics.OrderStatusCollector()
+    calls = []
+
+    def get_counts():
+        calls.append(None)
+        return [("orders", [("Accepted", 3)])]
+
+    monkeypatch.setattr(collector, "_get_counts", get_counts)
+    first = list(collector.collect())
+    second = list(collector.collect())
+    assert len(calls) == 1
+    assert first[0].samples == second[0].samples
+
+
+class FakeChannel(object):
+
+    def __init__(self, queues):
+        self.queues = queues
+        self.closed = False
+
+    def queue_declare(self, queue, passive):
+        if self.closed:
+            raise RuntimeError("channel is closed")
+        if queue not in self.queues:
+            self.closed = True  # like amqp does on a failed passive declare
+            raise RuntimeError("NOT_FOUND - no queue {0}".format(queue))
+        return collections.namedtuple("Ok", "message_count")(
+            self.queues[queue])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection(object):
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def channel(self):
+        return FakeChannel(self.queues)
+
+
+def test_queue_depth_skips_missing_queues(monkeypatch, settings):
+    from kombu import Queue
+    from config.celery import app
+    settings.CELERY_QUEUES = (Queue("missing"), Queue("control"))
+    monkeypatch.setattr(app, "connection",
+                        lambda: FakeConnection({"control": 3}))
+    metric, = metrics.QueueDepthCollector().collect()
+    assert [(s[1], s[2]) for s in metric.samples] == [
+        ({"queue": "control"}, 3)]
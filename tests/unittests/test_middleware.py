@@ -0,0 +1,175 @@
+"""Unit tests for pyoseo's middleware"""
+
+import gzip
+import io
+import json
+import os
+import zlib
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+import pytest
+
+from config import middleware
+
+pytestmark = pytest.mark.unit
+
+BODY = b"<soap:Envelope>" + b"<item/>" * 100 + b"</soap:Envelope>"
+
+
+def gzip_compress(data):
+    buffer_ = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer_, mode="wb") as fh:
+        fh.write(data)
+    return buffer_.getvalue()
+
+
+def build_compressed_request(rf, data, encoding):
+    return rf.post("/oseo/", data=data, content_type="application/soap+xml",
+                   HTTP_CONTENT_ENCODING=encoding)
+
+
+class TestCompressedRequestMiddleware(object):
+
+    @pytest.mark.parametrize("encoding, compress", [
+        ("gzip", gzip_compress),
+        ("deflate", zlib.compress),
+    ])
+    def test_body_is_decompressed(self, rf, encoding, compress):
+        request = build_compressed_request(rf, compress(BODY), encoding)
+        response = middleware.CompressedRequestMiddleware().process_request(
+            request)
+        assert response is None
+        assert request.body == BODY
+        assert request.META["CONTENT_LENGTH"] == str(len(BODY))
+        assert "HTTP_CONTENT_ENCODING" not in request.META
+
+    def test_uncompressed_body_is_left_alone(self, rf):
+        request = rf.post("/oseo/", data=BODY,
+                          content_type="application/soap+xml")
+        response = middleware.CompressedRequestMiddleware().process_request(
+            request)
+        assert response is None
+        assert request.body == BODY
+
+    def test_too_large_body_is_rejected(self, rf, settings):
+        settings.MAX_DECOMPRESSED_REQUEST_SIZE = 100
+        request = build_compressed_request(rf, gzip_compress(BODY), "gzip")
+        response = middleware.CompressedRequestMiddleware().process_request(
+            request)
+        assert response.status_code == 413
+
+    def test_corrupt_body_is_rejected(self, rf):
+        request = build_compressed_request(rf, b"not gzip data", "gzip")
+        response = middleware.CompressedRequestMiddleware().process_request(
+            request)
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("encoding, compress", [
+        ("gzip", gzip_compress),
+        ("deflate", zlib.compress),
+    ])
+    def test_truncated_body_is_rejected(self, rf, encoding, compress):
+        compressed = compress(BODY)
+        request = build_compressed_request(
+            rf, compressed[:len(compressed) // 2], encoding)
+        response = middleware.CompressedRequestMiddleware().process_request(
+            request)
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("length, ended", [(None, True), (20, False)])
+    def test_stream_end_without_eof_attribute(self, length, ended):
+        class Python2Decompressor(object):
+            """Hide the eof attribute, which python 2 does not have"""
+
+            def __init__(self):
+                self._decompressor = zlib.decompressobj()
+
+            def decompress(self, data):
+                return self._decompressor.decompress(data)
+
+            @property
+            def unused_data(self):
+                return self._decompressor.unused_data
+
+        decompressor = Python2Decompressor()
+        decompressor.decompress(zlib.compress(BODY)[:length])
+        assert middleware._stream_ended(decompressor) is ended
+
+
+@pytest.fixture
+def profiling(settings, tmpdir):
+    output_dir = tmpdir.join("profiles")
+    settings.PYOSEO_PROFILING = {
+        "enabled": True,
+        "header": "X-Pyoseo-Profile",
+        "sample_rate": 0,
+        "output_dir": str(output_dir),
+    }
+    return output_dir
+
+
+def profiled_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return HttpResponse("done")
+
+
+def plain_view(request):
+    return HttpResponse("done")
+
+
+def failing_view(request):
+    raise ValueError("view failed")
+
+
+class TestProfilingMiddleware(object):
+
+    def test_disabled_middleware_is_not_used(self, settings):
+        settings.PYOSEO_PROFILING = {"enabled": False}
+        with pytest.raises(MiddlewareNotUsed):
+            middleware.ProfilingMiddleware()
+
+    def test_unselected_request_is_not_profiled(self, profiling, rf):
+        profiling_middleware = middleware.ProfilingMiddleware()
+        request = rf.post("/oseo/", data=b"", content_type="text/xml")
+        assert profiling_middleware.process_view(
+            request, plain_view, (), {}) is None
+        response = profiling_middleware.process_response(
+            request, plain_view(request))
+        assert "X-Pyoseo-Profile-Id" not in response
+        assert profiling.listdir() == []
+
+    @pytest.mark.django_db
+    def test_request_with_header_is_profiled(self, profiling, rf):
+        profiling_middleware = middleware.ProfilingMiddleware()
+        request = rf.post("/oseo/", data=b"", content_type="text/xml",
+                          HTTP_X_PYOSEO_PROFILE="1")
+        request.oseo_metrics = ("GetStatus", "1.2", 0)
+        assert profiling_middleware.process_view(
+            request, profiled_view, (), {}) is None
+        response = profiling_middleware.process_response(
+            request, profiled_view(request))
+        profile_id = response["X-Pyoseo-Profile-Id"]
+        assert os.path.isfile(str(profiling.join(profile_id + ".prof")))
+        with open(str(profiling.join(profile_id + ".json"))) as fh:
+            summary = json.load(fh)
+        assert summary["operation"] == "GetStatus"
+        assert summary["query_count"] == 1
+        assert summary["elapsed"] >= 0
+
+    def test_view_exceptions_reach_other_middleware(self, profiling, rf):
+        profiling_middleware = middleware.ProfilingMiddleware()
+        request = rf.post("/oseo/", data=b"", content_type="text/xml",
+                          HTTP_X_PYOSEO_PROFILE="1")
+        assert profiling_middleware.process_view(
+            request, failing_view, (), {}) is None
+        with pytest.raises(ValueError):
+            failing_view(request)
+        assert profiling_middleware.process_exception(
+            request, ValueError()) is None
+        response = profiling_middleware.process_response(
+            request, HttpResponse(status=500))
+        assert profiling.join(
+            response["X-Pyoseo-Profile-Id"] + ".json").check()
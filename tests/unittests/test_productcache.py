@@ -0,0 +1,183 @@
+"""Unit tests for the shared product cache"""
+
+import os
+import shutil
+import time
+
+import pytest
+
+from config import productcache
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return productcache.ProductCache(directory=str(tmpdir.join("cache")),
+                                     max_bytes=100, max_age_days=1,
+                                     eviction_interval=0)
+
+
+def create_file(directory, name, size):
+    path = directory.join(name)
+    path.write("x" * size)
+    return str(path)
+
+
+class TestProductCache(object):
+
+    def test_key_depends_on_options(self):
+        first = productcache.ProductCache.get_key("col", "id", {"a": 1})
+        second = productcache.ProductCache.get_key("col", "id", {"a": 2})
+        assert first != second
+        assert first == productcache.ProductCache.get_key(
+            "col", "id", {"a": 1})
+
+    def test_miss(self, cache, tmpdir):
+        assert cache.fetch("missing", str(tmpdir)) is None
+        assert cache.misses == 1
+
+    def test_store_and_fetch(self, cache, tmpdir):
+        source = create_file(tmpdir, "product.tif", 10)
+        destination = tmpdir.mkdir("order")
+        key = cache.get_key("col", "id")
+        cache.store(key, [source])
+        paths = cache.fetch(key, str(destination))
+        assert paths == [str(destination.join("product.tif"))]
+        assert os.path.samefile(paths[0], source)
+        assert cache.hits == 1
+        assert cache.hit_ratio == 1
+
+    def test_least_recently_used_is_evicted(self, cache, tmpdir):
+        destination = tmpdir.mkdir("order")
+        first = cache.get_key("col", "first")
+        second = cache.get_key("col", "second")
+        third = cache.get_key("col", "third")
+        cache.store(first, [create_file(tmpdir, "first", 40)])
+        cache.store(second, [create_file(tmpdir, "second", 40)])
+        old = time.time() - 60
+        os.utime(cache.get_entry_path(second), (old, old))
+        cache.store(third, [create_file(tmpdir, "third", 40)])
+        assert cache.fetch(second, str(destination)) is None
+        assert cache.fetch(first, str(destination)) is not None
+        assert cache.fetch(third, str(destination)) is not None
+
+    def test_expired_entries_are_evicted(self, cache, tmpdir):
+        key = cache.get_key("col", "id")
+        cache.store(key, [create_file(tmpdir, "product", 10)])
+        old = time.time() - 2 * 24 * 60 * 60
+        os.utime(cache.get_entry_path(key), (old, old))
+        cache.evict()
+        assert not os.path.exists(cache.get_entry_path(key))
+
+    def test_eviction_is_not_run_on_every_store(self, tmpdir):
+        cache = productcache.ProductCache(directory=str(tmpdir.join("cache")),
+                                          max_bytes=10, max_age_days=1,
+                                          eviction_interval=300)
+        first = cache.get_key("col", "first")
+        second = cache.get_key("col", "second")
+        cache.store(first, [create_file(tmpdir, "first", 40)])
+        cache.store(second, [create_file(tmpdir, "second", 40)])
+        assert os.path.isdir(cache.get_entry_path(second))
+
+    def test_entry_evicted_while_fetching_is_a_miss(self, cache, tmpdir,
+                                                    monkeypatch):
+        destination = tmpdir.mkdir("order")
+        key = cache.get_key("col", "id")
+        cache.store(key, [create_file(tmpdir, "a", 10),
+                          create_file(tmpdir, "b", 10)])
+        original_link = productcache._link_or_copy
+
+        def link_then_evict(source, target):
+            original_link(source, target)
+            shutil.rmtree(cache.get_entry_path(key))
+
+        monkeypatch.setattr(productcache, "_link_or_copy", link_then_evict)
+        assert cache.fetch(key, str(destination)) is None
+        assert destination.listdir() == []
+        assert cache.misses == 1
+
+    def test_entries_removed_during_eviction_are_skipped(self, cache, tmpdir,
+                                                         monkeypatch):
+        first = cache.get_key("col", "first")
+        cache.store(first, [create_file(tmpdir, "first", 10)])
+
+        def removed_concurrently(path):
+            shutil.rmtree(path)
+            return productcache._get_directory_size(path)
+
+        monkeypatch.setattr(cache, "_get_entry_paths",
+                            lambda: iter([cache.get_entry_path(first),
+                                          cache.get_entry_path("ab" * 32)]))
+        monkeypatch.setattr(productcache, "_get_directory_size",
+                            removed_concurrently)
+        cache.evict()
+        assert not os.path.exists(cache.get_entry_path(first))
+
+    def test_store_in_existing_prefix_directory(self, cache, tmpdir):
+        key = cache.get_key("col", "id")
+        os.makedirs(os.path.dirname(cache.get_entry_path(key)))
+        cache.store(key, [create_file(tmpdir, "product", 10)])
+        assert os.path.isdir(cache.get_entry_path(key))
+
+
+class FakeProcessor(object):
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.processed = []
+        self.root = kwargs["root"]
+
+    def get_item_directory(self, order_id, item_id, user_name):
+        return os.path.join(self.root, user_name, str(order_id))
+
+    def get_file_url(self, path):
+        return "http://localhost/{0}".format(
+            os.path.relpath(path, self.root))
+
+    def process_item_online_access(self, identifier, item_id, order_id,
+                                   user_name, packaging, options,
+                                   delivery_options, **kwargs):
+        self.processed.append(item_id)
+        path = os.path.join(
+            self.get_item_directory(order_id, item_id, user_name),
+            identifier)
+        with open(path, "w") as fh:
+            fh.write("data")
+        return [self.get_file_url(path)]
+
+    def clean_item(self, url):
+        return "cleaned {0}".format(url)
+
+
+class TestCachingItemProcessor(object):
+
+    @pytest.fixture
+    def processor(self, cache, tmpdir, monkeypatch, settings):
+        settings.OSEOSERVER_CACHED_ITEM_PROCESSOR = "fake.FakeProcessor"
+        monkeypatch.setattr(productcache, "_product_cache", cache)
+        monkeypatch.setattr(productcache, "import_string",
+                            lambda path: FakeProcessor)
+        return productcache.CachingItemProcessor(
+            root=str(tmpdir.join("delivery")))
+
+    def process(self, processor, order_id, user_name="user",
+                options=None):
+        return processor.process_item_online_access(
+            "product.tif", "item{0}".format(order_id), order_id, user_name,
+            None, options or {}, {})
+
+    def test_repeated_product_is_served_from_cache(self, processor):
+        first = self.process(processor, 1)
+        second = self.process(processor, 2, user_name="other")
+        assert first == ["http://localhost/user/1/product.tif"]
+        assert second == ["http://localhost/other/2/product.tif"]
+        assert processor.processed == ["item1"]
+
+    def test_different_options_are_processed_again(self, processor):
+        self.process(processor, 1, options={"format": "tif"})
+        self.process(processor, 2, options={"format": "png"})
+        assert processor.processed == ["item1", "item2"]
+
+    def test_other_methods_are_delegated(self, processor):
+        assert processor.clean_item("url") == "cleaned url"
@@ -0,0 +1,194 @@
+"""Unit tests for the GetStatus response cache"""
+
+from django.db import transaction
+from django.http import HttpResponse
+import pytest
+
+from config import auth
+from config import middleware
+from config import responsecache
+
+pytestmark = pytest.mark.unit
+
+SOAP_NAMESPACES = {
+    "1.1": "http://schemas.xmlsoap.org/soap/envelope/",
+    "1.2": "http://www.w3.org/2003/05/soap-envelope",
+}
+
+REQUEST_TEMPLATE = """
+<soap:Envelope xmlns:soap="{soap}"
+               xmlns:oseo="http://www.opengis.net/oseo/1.0"
+               xmlns:wsse="{wsse}">
+  <soap:Header>
+    <wsse:Security>
+      <wsse:UsernameToken><wsse:Username>{user}</wsse:Username>
+      </wsse:UsernameToken>
+    </wsse:Security>
+  </soap:Header>
+  <soap:Body>{body}</soap:Body>
+</soap:Envelope>
+"""
+
+GET_STATUS = """
+<oseo:GetStatus service="OS" version="1.0.0">
+  <oseo:orderId>{order_id}</oseo:orderId>
+  <oseo:presentation>{presentation}</oseo:presentation>
+</oseo:GetStatus>
+"""
+
+GET_STATUS_SEARCH = """
+<oseo:GetStatus service="OS" version="1.0.0">
+  <oseo:filteringCriteria>
+    <oseo:orderStatus>Submitted</oseo:orderStatus>
+  </oseo:filteringCriteria>
+  <oseo:presentation>brief</oseo:presentation>
+</oseo:GetStatus>
+"""
+
+
+def build_request_body(body=None, soap_version="1.2", user="user",
+                       order_id=1, presentation="brief"):
+    if body is None:
+        body = GET_STATUS.format(order_id=order_id, presentation=presentation)
+    return REQUEST_TEMPLATE.format(
+        soap=SOAP_NAMESPACES[soap_version], wsse=auth.WSSE_NAMESPACE,
+        user=user, body=body
+    ).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    settings.CACHES = dict(settings.CACHES, responses={
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-responses",
+    })
+    cache = responsecache.get_response_cache()
+    yield cache
+    cache.clear()
+
+
+class Order(object):
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class Batch(object):
+    def __init__(self, order_id):
+        self.order_id = order_id
+
+
+class OrderItem(object):
+    pass
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    monkeypatch.setattr(responsecache, "_get_models",
+                        lambda: (Order, Batch, OrderItem))
+
+
+class TestGetRequestKey(object):
+
+    def test_same_request_has_the_same_key(self):
+        assert (responsecache.get_request_key(build_request_body()) ==
+                responsecache.get_request_key(build_request_body()))
+
+    @pytest.mark.parametrize("changes", [
+        {"user": "other"},
+        {"presentation": "full"},
+        {"soap_version": "1.1"},
+        {"order_id": 2},
+    ])
+    def test_keys_differ(self, changes):
+        assert (responsecache.get_request_key(build_request_body()) !=
+                responsecache.get_request_key(build_request_body(**changes)))
+
+    @pytest.mark.parametrize("body", [
+        GET_STATUS_SEARCH,
+        '<oseo:GetCapabilities service="OS"/>',
+    ])
+    def test_other_requests_are_not_cached(self, body):
+        assert responsecache.get_request_key(
+            build_request_body(body=body)) is None
+
+    def test_invalidated_order_gets_a_new_key(self):
+        key = responsecache.get_request_key(build_request_body())
+        responsecache.invalidate_order("1")
+        assert key != responsecache.get_request_key(build_request_body())
+
+
+class TestInvalidation(object):
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generation_changes_after_commit(self, fake_models):
+        generation = responsecache.get_order_generation(1)
+        with transaction.atomic():
+            responsecache.invalidate_changed_order(Order, Order(1))
+            responsecache.invalidate_changed_order(Batch, Batch(1))
+            assert responsecache.get_order_generation(1) == generation
+        assert responsecache.get_order_generation(1) != generation
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_changes_do_not_invalidate(self, fake_models):
+        generation = responsecache.get_order_generation(1)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                responsecache.invalidate_changed_order(Order, Order(1))
+                raise RuntimeError()
+        assert responsecache.get_order_generation(1) == generation
+        with transaction.atomic():
+            responsecache.invalidate_changed_order(Order, Order(1))
+        assert responsecache.get_order_generation(1) != generation
+
+    @pytest.mark.django_db(transaction=True)
+    def test_created_orders_do_not_invalidate(self, fake_models,
+                                              monkeypatch):
+        calls = []
+        monkeypatch.setattr(responsecache, "invalidate_orders",
+                            lambda order_ids: calls.append(set(order_ids)))
+        with transaction.atomic():
+            responsecache.invalidate_changed_order(Order, Order(1),
+                                                   created=True)
+            responsecache.invalidate_changed_order(Order, Order(2))
+            responsecache.invalidate_changed_order(Batch, Batch(2))
+        assert calls == [{2}]
+
+    def test_other_models_are_ignored(self, fake_models, monkeypatch):
+        monkeypatch.setattr(responsecache, "invalidate_order",
+                            lambda order_id: pytest.fail("invalidated"))
+        responsecache.invalidate_changed_order(HttpResponse, HttpResponse())
+
+
+class TestGetStatusCacheMiddleware(object):
+
+    def build_request(self, rf, operation="GetStatus"):
+        request = rf.post("/oseo/", data=build_request_body(),
+                          content_type="application/soap+xml")
+        request.oseo_metrics = (operation, "1.2", 0)
+        return request
+
+    def test_response_is_cached(self, rf):
+        cache_middleware = middleware.GetStatusCacheMiddleware()
+        request = self.build_request(rf)
+        assert cache_middleware.process_request(request) is None
+        cache_middleware.process_response(
+            request, HttpResponse(b"<status/>",
+                                  content_type="application/soap+xml"))
+        response = cache_middleware.process_request(self.build_request(rf))
+        assert response.content == b"<status/>"
+        assert response["Content-Type"] == "application/soap+xml"
+
+    def test_error_response_is_not_cached(self, rf):
+        cache_middleware = middleware.GetStatusCacheMiddleware()
+        request = self.build_request(rf)
+        cache_middleware.process_request(request)
+        cache_middleware.process_response(request, HttpResponse(status=500))
+        assert cache_middleware.process_request(
+            self.build_request(rf)) is None
+
+    def test_other_operations_are_not_parsed(self, rf, monkeypatch):
+        monkeypatch.setattr(responsecache, "get_request_key",
+                            lambda body: pytest.fail("parsed"))
+        request = self.build_request(rf, operation="Submit")
+        assert middleware.GetStatusCacheMiddleware().process_request(
+            request) is None